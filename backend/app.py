@@ -9,15 +9,24 @@ Version     : 1.1.0
 
 import os
 
+from config import current_config
 from database.db import close_db, init_db
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from logger import logger
+from ml.batcher import score_batcher
+from ml.jobs import training_jobs
+from ml.registry import model_registry
+from ml.scoring import rescorer
 from routes.auth import router as auth_router
+from routes.metrics import router as metrics_router
 from routes.model import router as model_router
 from routes.predict import router as predict_router
+from routes.stats import router as stats_router
 from routes.upload import router as upload_router
 from starlette.middleware.sessions import SessionMiddleware
+from utils.hashing import password_hasher
+from utils.metrics import MetricsMiddleware
 
 # Load environment variables
 SESSION_SECRET = os.getenv("SESSION_SECRET", "super-secret-session-key")
@@ -49,6 +58,9 @@ app.add_middleware(
     secret_key=SESSION_SECRET,
 )
 
+# Request latency and counts for /metrics; added last so it times the whole stack
+app.add_middleware(MetricsMiddleware)
+
 # ------------------------
 # Database Lifecycle
 # ------------------------
@@ -59,6 +71,8 @@ async def startup():
     try:
         await init_db()
         logger.info("Database initialized successfully.")
+        # Bring stored predictions up to date with the served model
+        rescorer.start()
     except Exception as e:
         logger.error(f"Startup error: {e}")
         raise HTTPException(status_code=500, detail="Database startup failed")
@@ -67,6 +81,10 @@ async def startup():
 @app.on_event("shutdown")
 async def shutdown():
     try:
+        await rescorer.stop()
+        await score_batcher.stop()
+        training_jobs.shutdown()
+        password_hasher.shutdown()
         await close_db()
         logger.info("Database closed.")
     except Exception as e:
@@ -82,6 +100,63 @@ app.include_router(auth_router, prefix="/auth", tags=["Auth"])
 app.include_router(upload_router, tags=["CSV Upload"])
 app.include_router(model_router, tags=["ML Training"])
 app.include_router(predict_router, tags=["Predict"])
+app.include_router(stats_router, tags=["Stats"])
+app.include_router(metrics_router, tags=["Metrics"])
+
+# ------------------------
+# Pre-fork Server
+# ------------------------
+
+
+def preload():
+    # Runs once in the parent process: forked workers start with the model
+    # already loaded and share its memory pages until they write to them
+    try:
+        loaded = model_registry.get()
+        logger.info(f"Preloaded model {loaded.version} before forking workers.")
+    except FileNotFoundError:
+        logger.info("No model to preload; workers load it once it is trained.")
+
+
+def clear_metrics_dir(path: str):
+    # Values of a previous run's workers would otherwise be reported again
+    if not path or not os.path.isdir(path):
+        raise RuntimeError(
+            "PROMETHEUS_MULTIPROC_DIR must name an existing directory "
+            "when SERVER_WORKERS > 1"
+        )
+    for name in os.listdir(path):
+        if name.endswith(".db"):
+            os.remove(os.path.join(path, name))
+
+
+def worker_exit(server, worker):
+    # Live gauges (e.g. requests in flight) of a finished worker stop counting
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def serve(workers: int, port: int):
+    from gunicorn.app.base import BaseApplication
+
+    clear_metrics_dir(current_config.PROMETHEUS_MULTIPROC_DIR)
+
+    class PreforkServer(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"0.0.0.0:{port}")
+            self.cfg.set("workers", workers)
+            self.cfg.set("worker_class", "uvicorn.workers.UvicornWorker")
+            # Import the app (and preload) before forking, not in each worker
+            self.cfg.set("preload_app", True)
+            self.cfg.set("child_exit", worker_exit)
+
+        def load(self):
+            preload()
+            return app
+
+    PreforkServer().run()
+
 
 # ------------------------
 # Entry Point (if run directly)
@@ -91,5 +166,9 @@ if __name__ == "__main__":
     import uvicorn
 
     debug_mode = os.getenv("FASTAPI_DEBUG", "0") == "1"
+    port = int(os.getenv("PORT", "8000"))
     logger.info("FASTAPI APP IS RUNNING")
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=debug_mode)
+    if current_config.SERVER_WORKERS > 1:
+        serve(current_config.SERVER_WORKERS, port)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=port, reload=debug_mode)
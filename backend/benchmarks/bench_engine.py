@@ -0,0 +1,75 @@
+"""
+Latency of the compiled forest engine against the sklearn pipeline.
+
+    python -m benchmarks.bench_engine --train-rows 20000 --batches 1 32 10000
+    python -m benchmarks.bench_engine --model fraud_model.pkl
+
+Fits build_pipeline on synthetic transactions (or loads --model), compiles it,
+checks that both return identical probabilities and times predict_proba on
+batches of feature rows, best of --repeat.
+"""
+
+import argparse
+import time
+from typing import Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+from benchmarks.synthetic import generate_transactions
+from ml.features import CAT_FEATURES, NUM_FEATURES, feature_transformer
+from ml.forest_engine import compile_pipeline
+from ml.train_model import build_pipeline
+
+
+def features(rows: int, seed: int) -> Tuple[pd.DataFrame, np.ndarray]:
+    df = generate_transactions(rows, seed=seed)
+    return feature_transformer.transform(df), df["is_fraud"].to_numpy()
+
+
+def best_of(fn, X: pd.DataFrame, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(X)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--model", help="trained artifact; default: fit one")
+    parser.add_argument("--train-rows", type=int, default=20_000)
+    parser.add_argument("--batches", type=int, nargs="+", default=[1, 32, 10_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.model:
+        model = joblib.load(args.model)
+    else:
+        print(f"Fitting the pipeline on {args.train_rows} rows...")
+        model = build_pipeline(NUM_FEATURES, CAT_FEATURES)
+        model.fit(*features(args.train_rows, seed=1))
+    engine = compile_pipeline(model, "bench")
+
+    # Other seed: includes merchants the model has not seen
+    X, _ = features(max(args.batches), seed=2)
+    if not np.array_equal(model.predict_proba(X), engine.predict_proba(X)):
+        raise SystemExit("Compiled engine disagrees with the pipeline")
+    print(f"Identical probabilities on {len(X)} rows, {len(engine.value)} nodes.")
+
+    print(f"{'batch':>7} {'sklearn ms':>12} {'compiled ms':>12} {'speedup':>8}")
+    for size in args.batches:
+        batch = X.head(size)
+        sklearn = best_of(model.predict_proba, batch, args.repeat)
+        compiled = best_of(engine.predict_proba, batch, args.repeat)
+        print(
+            f"{size:>7} {sklearn * 1000:>12.3f} {compiled * 1000:>12.3f} "
+            f"{sklearn / compiled:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
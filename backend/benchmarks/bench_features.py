@@ -0,0 +1,63 @@
+"""
+Rows/sec of the shared feature transformer.
+
+    python -m benchmarks.bench_features --rows 10000 100000 1000000
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from benchmarks.synthetic import generate_transactions
+from ml.features import feature_transformer
+
+
+def legacy_features(df: pd.DataFrame) -> pd.DataFrame:
+    # The inline serving code this module replaced, kept for comparison
+    df["distance"] = np.sqrt(
+        (df["merch_lat"] - df["lat"]) ** 2 + (df["merch_long"] - df["long"]) ** 2
+    )
+    df["hour"] = pd.to_datetime(df["trans_date_trans_time"], dayfirst=True).dt.hour
+    df["day_of_week"] = pd.to_datetime(
+        df["trans_date_trans_time"], dayfirst=True
+    ).dt.dayofweek
+    df["month"] = pd.to_datetime(df["trans_date_trans_time"], dayfirst=True).dt.month
+    return df
+
+
+def best_of(fn, df: pd.DataFrame, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        frame = df.copy()
+        started = time.perf_counter()
+        fn(frame)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--no-legacy",
+        action="store_true",
+        help="skip the legacy path (format inference is ~4k rows/s)",
+    )
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'legacy rows/s':>15} {'transformer rows/s':>20}")
+    for rows in args.rows:
+        df = generate_transactions(rows)
+        current = best_of(feature_transformer.transform, df, args.repeat)
+        legacy = "-"
+        if not args.no_legacy:
+            legacy = f"{rows / best_of(legacy_features, df, args.repeat):,.0f}"
+        print(f"{rows:>10} {legacy:>15} {rows / current:>20,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Reading training features from the database: ORM rows versus columnar fetch.
+
+    python -m benchmarks.bench_fetch --rows 100000 1000000 --load
+
+--load first inserts synthetic transactions until the table holds the largest
+row count asked for. Set --db-url to run against another database.
+"""
+
+import argparse
+import asyncio
+import time
+
+import pandas as pd
+from benchmarks.synthetic import generate_transactions
+from config import current_config
+from database.bulk import bulk_load_transactions
+from database.columnar import fetch_columns
+from database.data_version import bump_data_version
+from database.db import DB_URL, create_schema, tortoise_config
+from database.dictionary import (
+    PendingCodes,
+    decode_columns,
+    encode_columns,
+    stored_columns,
+)
+from ml.dataset import TRAINING_COLUMNS
+from ml.features import feature_transformer
+from models.transaction import Transaction
+from tortoise import Tortoise
+from tortoise.transactions import in_transaction
+from utils.ingest import CHUNK_COLUMNS, STRING_COLUMNS, coerce_chunk
+
+
+async def load_rows(rows: int):
+    # Same trans_num sequence every time, so already stored rows are skipped
+    df = generate_transactions(rows)
+    df[list(STRING_COLUMNS)] = df[list(STRING_COLUMNS)].astype(str)
+    chunk_rows = current_config.UPLOAD_CHUNK_ROWS
+    pending = PendingCodes()
+    async with in_transaction() as connection:
+        for start in range(0, rows, chunk_rows):
+            chunk = coerce_chunk(df.iloc[start : start + chunk_rows].copy())
+            chunk = await encode_columns(chunk, connection, pending)
+            await bulk_load_transactions(
+                chunk, stored_columns(CHUNK_COLUMNS), connection
+            )
+        await bump_data_version(connection)
+    pending.commit()
+
+
+# -----------------------------------------------
+# Fetch paths, each ending in model features
+# -----------------------------------------------
+async def orm_all_columns(rows: int) -> pd.DataFrame:
+    # Every column, one dict per row
+    data = await Transaction.all().order_by("id").limit(rows).values()
+    return pd.DataFrame(data)
+
+
+async def orm_feature_columns(rows: int) -> pd.DataFrame:
+    data = await Transaction.all().order_by("id").limit(rows).values(*TRAINING_COLUMNS)
+    return pd.DataFrame(data, columns=TRAINING_COLUMNS)
+
+
+async def columnar(rows: int) -> pd.DataFrame:
+    return pd.DataFrame(await fetch_columns(TRAINING_COLUMNS, limit=rows), copy=False)
+
+
+PATHS = {
+    "orm, all columns": orm_all_columns,
+    "orm, feature columns": orm_feature_columns,
+    "columnar": columnar,
+}
+
+
+async def best_of(fetch, rows: int, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        df = await decode_columns(await fetch(rows))
+        feature_transformer.transform(df)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+async def run(args):
+    await Tortoise.init(config=tortoise_config(args.db_url))
+    try:
+        await create_schema()
+        if args.load:
+            await load_rows(max(args.rows))
+        stored = await Transaction.all().count()
+
+        print(f"{'rows':>10} " + " ".join(f"{name:>21}" for name in PATHS))
+        for rows in args.rows:
+            if rows > stored:
+                print(f"{rows:>10} skipped: the table has {stored} rows (use --load)")
+                continue
+            rates = []
+            for fetch in PATHS.values():
+                seconds = await best_of(fetch, rows, args.repeat)
+                rates.append(f"{rows / seconds:>17,.0f} r/s")
+            print(f"{rows:>10} " + " ".join(rates))
+    finally:
+        await Tortoise.close_connections()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--db-url", default=DB_URL)
+    parser.add_argument("--load", action="store_true")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
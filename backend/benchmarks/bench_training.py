@@ -0,0 +1,111 @@
+"""
+Training time and peak memory of the categorical encoding and class balancing
+options of build_pipeline, against the original one-hot + SMOTE pipeline.
+
+    python -m benchmarks.bench_training --rows 50000 200000
+    python -m benchmarks.bench_training --estimator shallow_forest \\
+        --configs onehot:smote frequency:class_weight target:undersample
+
+Each configuration is fitted in a fresh process on the same synthetic
+transactions' features, so peak RSS is its own; "fit MB" is the growth of the
+peak during fit(). PR-AUC is measured on a held-out 30%.
+"""
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+
+DEFAULT_CONFIGS = [
+    "onehot:smote",
+    "frequency:class_weight",
+    "target:class_weight",
+    "hashed:class_weight",
+    "frequency:undersample",
+]
+
+
+def write_dataset(rows: int, seed: int, path: str):
+    from benchmarks.synthetic import generate_transactions
+    from ml.features import feature_transformer
+
+    df = generate_transactions(rows, seed=seed)
+    joblib.dump((feature_transformer.transform(df), df["is_fraud"].to_numpy()), path)
+
+
+def fit_config(dataset: str, estimator: str, encoding: str, balancing: str) -> dict:
+    # Runs in its own process, which only loads the features before fitting
+    from ml.features import CAT_FEATURES, NUM_FEATURES
+    from ml.train_model import build_pipeline, peak_rss_mb, quality_metrics
+    from sklearn.model_selection import train_test_split
+
+    X, y = joblib.load(dataset)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.3, stratify=y, random_state=42
+    )
+    model = build_pipeline(NUM_FEATURES, CAT_FEATURES, estimator, encoding, balancing)
+    before = peak_rss_mb()
+    started = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - started
+    peak = peak_rss_mb()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.pkl")
+        joblib.dump(model, path, compress=0)
+        artifact_bytes = os.path.getsize(path)
+    fraud_col = list(model.classes_).index(1)
+    score = model.predict_proba(X_test)[:, fraud_col]
+    return {
+        "fit_seconds": fit_seconds,
+        "peak_rss_mb": peak,
+        "fit_rss_mb": peak - before,
+        "artifact_bytes": artifact_bytes,
+        **quality_metrics(y_test, score, 0.9),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--rows", type=int, nargs="+", default=[50_000])
+    parser.add_argument("--estimator", default="random_forest")
+    parser.add_argument(
+        "--configs",
+        nargs="+",
+        default=DEFAULT_CONFIGS,
+        help="encoding:balancing pairs",
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    # spawn: a forked child would inherit the parent's peak RSS
+    context = multiprocessing.get_context("spawn")
+    print(
+        f"{'rows':>9} {'encoding:balancing':<24} {'fit s':>8} {'peak MB':>8} "
+        f"{'fit MB':>8} {'model MB':>9} {'PR-AUC':>7}"
+    )
+    with tempfile.TemporaryDirectory(prefix="fraud-bench-") as work_dir:
+        for rows in args.rows:
+            dataset = os.path.join(work_dir, f"features-{rows}.pkl")
+            write_dataset(rows, args.seed, dataset)
+            for config in args.configs:
+                encoding, balancing = config.split(":")
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                    result = pool.submit(
+                        fit_config, dataset, args.estimator, encoding, balancing
+                    ).result()
+                print(
+                    f"{rows:>9} {config:<24} {result['fit_seconds']:>8.2f} "
+                    f"{result['peak_rss_mb']:>8.0f} {result['fit_rss_mb']:>8.0f} "
+                    f"{result['artifact_bytes'] / 1e6:>9.1f} {result['pr_auc']:>7.4f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
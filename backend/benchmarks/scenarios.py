@@ -0,0 +1,133 @@
+import json
+import os
+import shutil
+import time
+from typing import Dict, List
+
+import httpx
+import pandas as pd
+from config import current_config
+from fastapi.concurrency import run_in_threadpool
+from ml.registry import model_registry
+from ml.scoring import rescorer
+from ml.train_model import main as train_model
+
+# Timed steps of benchmarks/suite.py. Each returns a dict of measurements;
+# durations are in seconds unless the key says otherwise.
+
+
+def csv_bytes(df: pd.DataFrame) -> bytes:
+    return df.to_csv(index=False).encode()
+
+
+def latency_summary(timings: List[float]) -> Dict[str, float]:
+    ordered = sorted(timings)
+
+    def percentile(q: float) -> float:
+        # Nearest rank
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {
+        "requests": len(ordered),
+        "p50_ms": round(percentile(0.5), 3),
+        "p95_ms": round(percentile(0.95), 3),
+        "p99_ms": round(percentile(0.99), 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+async def upload(client: httpx.AsyncClient, body: bytes, rows: int) -> dict:
+    # Replaces the table, so every size starts from the same state
+    started = time.perf_counter()
+    response = await client.post(
+        "/upload-csv",
+        params={"mode": "replace"},
+        files={"file": ("bench.csv", body, "text/csv")},
+    )
+    seconds = time.perf_counter() - started
+    response.raise_for_status()
+    load = response.json()["load"]
+    return {
+        "seconds": round(seconds, 4),
+        "rows_per_sec": round(rows / seconds, 1),
+        "insert_method": load["method"],
+        "insert_rows_per_sec": load["rows_per_sec"],
+    }
+
+
+async def train() -> dict:
+    result = await train_model()
+    await run_in_threadpool(model_registry.activate)
+    return {
+        "seconds": round(result.seconds, 4),
+        "rows": result.rows,
+        "model_bytes": os.path.getsize(result.path),
+        "estimator": result.report["estimator"],
+        "pr_auc": result.report["pr_auc"],
+    }
+
+
+async def restore_model(path: str):
+    # Serve the artifact at `path` again, as if it had just been trained
+    shutil.copyfile(path, current_config.MODEL_PATH)
+    await run_in_threadpool(model_registry.activate)
+
+
+async def rescore() -> dict:
+    # What the background rescorer does after a new model is activated
+    started = time.perf_counter()
+    rows = await rescorer.rescore_stale()
+    seconds = time.perf_counter() - started
+    return {
+        "seconds": round(seconds, 4),
+        "rows": rows,
+        "rows_per_sec": round(rows / seconds, 1) if seconds > 0 else 0.0,
+    }
+
+
+async def transactions(client: httpx.AsyncClient, pages: int, page_size: int) -> dict:
+    timings, rows, cursor = [], 0, None
+    for _ in range(pages):
+        params = {"limit": page_size}
+        if cursor is not None:
+            params["cursor"] = cursor
+        started = time.perf_counter()
+        response = await client.get("/transactions", params=params)
+        timings.append(time.perf_counter() - started)
+        response.raise_for_status()
+        page = response.json()
+        rows += len(page["transactions"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    return {
+        **latency_summary(timings),
+        "rows_per_sec": round(rows / sum(timings), 1),
+    }
+
+
+async def predict_fraud(client: httpx.AsyncClient, repeat: int) -> dict:
+    # The first call also refreshes the Arrow snapshot after the upload
+    timings, size = [], 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = await client.get("/predict-fraud")
+        timings.append(time.perf_counter() - started)
+        response.raise_for_status()
+        size = len(response.content)
+    result = {"cold_seconds": round(timings[0], 4), "response_bytes": size}
+    if len(timings) > 1:
+        result["warm_seconds"] = round(min(timings[1:]), 4)
+    return result
+
+
+async def score(client: httpx.AsyncClient, df: pd.DataFrame) -> dict:
+    # One transaction per request, sent one after another
+    payloads = json.loads(df.to_json(orient="records"))
+    timings = []
+    for payload in payloads:
+        started = time.perf_counter()
+        response = await client.post("/score", json=payload)
+        timings.append(time.perf_counter() - started)
+        response.raise_for_status()
+    return latency_summary(timings)
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+from config import current_config
+from utils.ingest import REQUIRED_COLUMNS
+
+CATEGORIES = [
+    "entertainment",
+    "food_dining",
+    "gas_transport",
+    "grocery_net",
+    "grocery_pos",
+    "health_fitness",
+    "home",
+    "kids_pets",
+    "misc_net",
+    "misc_pos",
+    "personal_care",
+    "shopping_net",
+    "shopping_pos",
+    "travel",
+]
+
+
+# -----------------------------------------------
+# Synthetic transactions in the /upload-csv schema
+# -----------------------------------------------
+def generate_transactions(
+    rows: int,
+    fraud_rate: float = 0.005,
+    merchants: int = 700,
+    seed: int = 42,
+) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+
+    start = np.datetime64("2020-06-21T00:00")
+    minutes = rng.integers(0, 60 * 24 * 365, rows)
+    timestamps = pd.Series(start + minutes.astype("timedelta64[m]"))
+
+    lat = rng.uniform(25.0, 48.0, rows)
+    long = rng.uniform(-124.0, -67.0, rows)
+    is_fraud = rng.random(rows) < fraud_rate
+
+    df = pd.DataFrame(
+        {
+            "trans_date_trans_time": timestamps.dt.strftime(
+                current_config.TRANSACTION_TIME_FORMAT
+            ),
+            "cc_num": rng.integers(10**15, 10**16, rows).astype(str),
+            "merchant": np.char.add(
+                "fraud_merchant_", rng.integers(0, merchants, rows).astype(str)
+            ),
+            "category": np.array(CATEGORIES)[rng.integers(0, len(CATEGORIES), rows)],
+            # Fraudulent purchases skew larger so models have something to learn
+            "amt": np.round(
+                np.where(
+                    is_fraud, rng.gamma(3.0, 200.0, rows), rng.gamma(2.0, 35.0, rows)
+                ),
+                2,
+            ),
+            "first": "Jane",
+            "last": "Doe",
+            "gender": np.where(rng.random(rows) < 0.5, "F", "M"),
+            "street": "1 Main St",
+            "city": "Springfield",
+            "state": "IL",
+            "zip": rng.integers(10000, 99999, rows),
+            "lat": lat,
+            "long": long,
+            "city_pop": rng.integers(100, 3_000_000, rows),
+            "job": "Engineer",
+            "dob": "19/03/1968",
+            "trans_num": np.char.add(f"{seed:x}-", np.arange(rows).astype(str)),
+            "unix_time": 1371816865 + minutes * 60,
+            "merch_lat": lat + rng.normal(0.0, 0.6, rows),
+            "merch_long": long + rng.normal(0.0, 0.6, rows),
+            "is_fraud": is_fraud.astype(int),
+        }
+    )
+    return df[list(REQUIRED_COLUMNS)]
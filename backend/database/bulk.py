@@ -0,0 +1,199 @@
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from models.transaction import Transaction
+from tortoise import Tortoise, timezone
+from tortoise.backends.asyncpg import AsyncpgDBClient
+from tortoise.backends.base.client import BaseDBAsyncClient
+
+# Bulk loader for the transactions table: PostgreSQL binary COPY through the
+# asyncpg connection Tortoise already holds, batched executemany elsewhere.
+# Rows whose trans_num already exists are skipped by the database, so an
+# append only costs as much as the rows it brings in.
+
+EXECUTEMANY_BATCH_ROWS = 5000
+CONFLICT_COLUMN = "trans_num"
+
+
+@dataclass
+class LoadStats:
+    method: str
+    rows: int
+    seconds: float
+    duplicates: int = 0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "method": self.method,
+            "rows": self.rows,
+            "duplicates": self.duplicates,
+            "seconds": round(self.seconds, 4),
+            "rows_per_sec": round(self.rows_per_sec, 1),
+        }
+
+
+# -----------------------------
+# Helpers
+# -----------------------------
+def _placeholders(dialect: str, count: int) -> str:
+    if dialect == "postgres":
+        return ", ".join(f"${i}" for i in range(1, count + 1))
+    if dialect == "mysql":
+        return ", ".join(["%s"] * count)
+    return ", ".join(["?"] * count)
+
+
+def _quoted(columns: Sequence[str]) -> str:
+    return ", ".join(f'"{col}"' for col in columns)
+
+
+def _column_list(values: pd.Series) -> list:
+    if pd.api.types.is_datetime64_any_dtype(values):
+        # Drivers take datetime.datetime, not pandas Timestamps
+        return list(values.dt.to_pydatetime())
+    return values.tolist()
+
+
+def _column_lists(batch: pd.DataFrame, columns: Sequence[str]) -> List[list]:
+    # One native Python list per column; rows are only materialized as tuples
+    # while they are streamed to the driver.
+    return [_column_list(batch[col]) for col in columns]
+
+
+# -----------------------------
+# Loaders
+# -----------------------------
+async def _copy_records(
+    connection: BaseDBAsyncClient, table: str, columns: List[str], data: List[list]
+) -> int:
+    # COPY cannot skip conflicting rows, so stage the batch in a temp table and
+    # move it over with INSERT ... ON CONFLICT DO NOTHING.
+    names = _quoted(columns)
+    stage = f"{table}_stage"
+    async with connection.acquire_connection() as raw:
+        async with raw.transaction():
+            await raw.execute(
+                f'CREATE TEMP TABLE IF NOT EXISTS "{stage}" ON COMMIT DROP AS '
+                f'SELECT {names} FROM "{table}" WITH NO DATA'
+            )
+            await raw.copy_records_to_table(stage, records=zip(*data), columns=columns)
+            result = await raw.execute(
+                f'INSERT INTO "{table}" ({names}) SELECT {names} FROM "{stage}" '
+                f'ON CONFLICT ("{CONFLICT_COLUMN}") DO NOTHING'
+            )
+            await raw.execute(f'TRUNCATE "{stage}"')
+    # Command tag is "INSERT 0 <rows>"
+    return int(result.split()[-1])
+
+
+async def _execute_many(
+    connection: BaseDBAsyncClient, table: str, columns: List[str], data: List[list]
+) -> int:
+    dialect = connection.capabilities.dialect
+    query = (
+        f'INSERT INTO "{table}" ({_quoted(columns)}) '
+        f"VALUES ({_placeholders(dialect, len(columns))})"
+    )
+    key_index = columns.index(CONFLICT_COLUMN)
+    key = data[key_index]
+    inserted = 0
+    for start in range(0, len(key), EXECUTEMANY_BATCH_ROWS):
+        stop = start + EXECUTEMANY_BATCH_ROWS
+        # Indexed lookup bounded by the batch size, never by the table size
+        existing = set(
+            await Transaction.filter(trans_num__in=key[start:stop])
+            .using_db(connection)
+            .values_list(CONFLICT_COLUMN, flat=True)
+        )
+        rows = [
+            list(row)
+            for row in zip(*(col[start:stop] for col in data))
+            if row[key_index] not in existing
+        ]
+        if rows:
+            await connection.execute_many(query, rows)
+        inserted += len(rows)
+    return inserted
+
+
+async def bulk_load_transactions(
+    batch: pd.DataFrame,
+    columns: Sequence[str],
+    connection: Optional[BaseDBAsyncClient] = None,
+) -> LoadStats:
+    """
+    Write one columnar batch into `transactions`, skipping trans_num values that
+    are already stored. `columns` must be model fields; `created_at` is filled in
+    here since the ORM is not involved.
+    """
+    connection = connection or Tortoise.get_connection("default")
+    table = Transaction._meta.db_table
+
+    started = time.perf_counter()
+    columns = list(columns)
+    data = _column_lists(batch, columns)
+
+    created_at = timezone.now()
+    columns.append("created_at")
+
+    if isinstance(connection, AsyncpgDBClient):
+        data.append([created_at] * len(batch))
+        inserted = await _copy_records(connection, table, columns, data)
+        method = "copy"
+    else:
+        # Drivers without native bool/datetime adapters get the ORM's storage form
+        data = [
+            (
+                [None if v is None else int(v) for v in col]
+                if col and isinstance(col[0], bool)
+                else col
+            )
+            for col in data
+        ]
+        data.append([created_at.isoformat(" ")] * len(batch))
+        inserted = await _execute_many(connection, table, columns, data)
+        method = "executemany"
+
+    return LoadStats(
+        method, inserted, time.perf_counter() - started, len(batch) - inserted
+    )
+
+
+async def bulk_update_scores(
+    ids: List[int],
+    scores: np.ndarray,
+    predicted: np.ndarray,
+    version: str,
+    connection: Optional[BaseDBAsyncClient] = None,
+) -> None:
+    """Store fraud predictions for existing rows, one statement per batch."""
+    connection = connection or Tortoise.get_connection("default")
+    table = Transaction._meta.db_table
+
+    if isinstance(connection, AsyncpgDBClient):
+        await connection.execute_query(
+            f'UPDATE "{table}" SET "fraud_score" = s.score, '
+            f'"predicted_fraud" = s.predicted, "score_version" = $4 '
+            f"FROM unnest($1::int[], $2::float8[], $3::bool[]) AS s(id, score, predicted) "
+            f'WHERE "{table}"."id" = s.id',
+            [ids, scores.tolist(), predicted.tolist(), version],
+        )
+        return
+
+    dialect = connection.capabilities.dialect
+    p = _placeholders(dialect, 4).split(", ")
+    await connection.execute_many(
+        f'UPDATE "{table}" SET "fraud_score" = {p[0]}, "predicted_fraud" = {p[1]}, '
+        f'"score_version" = {p[2]} WHERE "id" = {p[3]}',
+        [
+            [score, int(flag), version, row_id]
+            for score, flag, row_id in zip(scores.tolist(), predicted.tolist(), ids)
+        ],
+    )
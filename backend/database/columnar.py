@@ -0,0 +1,217 @@
+from functools import lru_cache, partial
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from models.transaction import Transaction
+from tortoise import Tortoise, fields
+from tortoise.backends.asyncpg import AsyncpgDBClient
+from tortoise.backends.base.client import BaseDBAsyncClient
+
+# Column reads for the ML paths that skip model instances and per-row dicts:
+# only the requested columns are selected with raw SQL and turned into one typed
+# NumPy array per column. On PostgreSQL, fixed-width NOT NULL columns come as a
+# binary COPY that a structured dtype parses in place, so no Python object is
+# created per value; other columns go through the driver's records.
+
+# Checked in order, so subclasses come before their base
+_NUMPY_DTYPES = [
+    (fields.SmallIntField, "int16"),
+    (fields.BigIntField, "int64"),
+    (fields.IntField, "int32"),
+    (fields.FloatField, "float64"),
+    (fields.BooleanField, "bool"),
+]
+
+# Binary COPY encoding per dtype; one-character text is sent as "char"
+_WIRE_DTYPES = {
+    "int16": ">i2",
+    "int32": ">i4",
+    "int64": ">i8",
+    "float64": ">f8",
+    "bool": "?",
+    "char": "u1",
+}
+COPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+# "char" sends an empty string as a zero byte
+_ASCII = np.array([""] + [chr(code) for code in range(1, 128)], dtype=object)
+
+
+def _field(column: str) -> fields.Field:
+    meta = Transaction._meta
+    names = {db_column: name for name, db_column in meta.fields_db_projection.items()}
+    return meta.fields_map[names[column]]
+
+
+@lru_cache(maxsize=None)
+def column_dtype(column: str) -> np.dtype:
+    """NumPy dtype for a stored column of `transactions`; object if not numeric."""
+    field = _field(column)
+    for field_type, dtype in _NUMPY_DTYPES:
+        if isinstance(field, field_type):
+            # NULL becomes NaN in float columns; other nullable columns stay objects
+            if field.null and dtype != "float64":
+                break
+            return np.dtype(dtype)
+    return np.dtype(object)
+
+
+@lru_cache(maxsize=None)
+def _copy_type(column: str) -> Optional[str]:
+    # Key of _WIRE_DTYPES, or None if the column is not fixed width on the wire
+    field = _field(column)
+    if field.null:
+        return None
+    if isinstance(field, fields.CharField) and field.max_length == 1:
+        return "char"
+    dtype = column_dtype(column)
+    return dtype.name if dtype.name in _WIRE_DTYPES else None
+
+
+# -----------------------------------------------
+# Decoding
+# -----------------------------------------------
+def _arrays(rows: list, columns: Sequence[str]) -> Dict[str, np.ndarray]:
+    if not rows:
+        return {col: np.empty(0, dtype=column_dtype(col)) for col in columns}
+    return {
+        col: np.array(values, dtype=column_dtype(col))
+        for col, values in zip(columns, zip(*rows))
+    }
+
+
+def parse_binary_copy(data: bytes, columns: Sequence[str]) -> Dict[str, np.ndarray]:
+    """Arrays from the COPY (FORMAT binary) output of fixed-width NOT NULL columns."""
+    if not data.startswith(COPY_SIGNATURE):
+        raise ValueError("Not a binary COPY stream")
+    extension = int.from_bytes(data[15:19], "big")
+    # Every tuple is the field count, then (length, value) per field
+    layout = [("fields", ">i2")]
+    for i, col in enumerate(columns):
+        layout += [(f"length{i}", ">i4"), (f"value{i}", _WIRE_DTYPES[_copy_type(col)])]
+    dtype = np.dtype(layout)
+    body = memoryview(data)[19 + extension : len(data) - 2]
+    if len(body) % dtype.itemsize:
+        raise ValueError("Binary COPY stream does not match the column layout")
+    records = np.frombuffer(body, dtype=dtype)
+    if (records["fields"] != len(columns)).any():
+        raise ValueError("Binary COPY stream does not match the column layout")
+
+    arrays = {}
+    for i, col in enumerate(columns):
+        values = records[f"value{i}"]
+        if (records[f"length{i}"] != values.dtype.itemsize).any():
+            raise ValueError(f"Unexpected value width in column {col}")
+        if _copy_type(col) != "char":
+            arrays[col] = values.astype(column_dtype(col))
+        elif len(values) and values.max() >= len(_ASCII):
+            raise ValueError(f"Non-ASCII value in column {col}")
+        else:
+            arrays[col] = _ASCII[values]
+    return arrays
+
+
+# -----------------------------------------------
+# Fetching
+# -----------------------------------------------
+def _select(
+    columns: Sequence[str],
+    where: str,
+    params: Sequence,
+    dialect: str,
+    limit: Optional[int],
+    copy: bool = False,
+) -> str:
+    # `where` marks each parameter with {}
+    marks = [f"${i + 1}" if dialect == "postgres" else "?" for i in range(len(params))]
+    names = ", ".join(
+        f'"{col}"::"char"' if copy and _copy_type(col) == "char" else f'"{col}"'
+        for col in columns
+    )
+    query = f'SELECT {names} FROM "{Transaction._meta.db_table}"'
+    if where:
+        query += f" WHERE {where.format(*marks)}"
+    query += ' ORDER BY "id"'
+    if limit is not None:
+        query += f" LIMIT {int(limit)}"
+    return query
+
+
+async def _fetch_postgres(
+    raw, columns: Sequence[str], where: str, params: Sequence, limit: Optional[int]
+) -> Dict[str, np.ndarray]:
+    # `raw` is an asyncpg connection
+    if not all(map(_copy_type, columns)):
+        query = _select(columns, where, params, "postgres", limit)
+        return _arrays(await raw.fetch(query, *params), columns)
+
+    chunks: List[bytes] = []
+
+    async def collect(chunk: bytes):
+        chunks.append(chunk)
+
+    query = _select(columns, where, params, "postgres", limit, copy=True)
+    await raw.copy_from_query(query, *params, output=collect, format="binary")
+    return parse_binary_copy(b"".join(chunks), columns)
+
+
+async def _fetch_records(
+    connection: BaseDBAsyncClient,
+    columns: Sequence[str],
+    where: str,
+    params: Sequence,
+    limit: Optional[int],
+) -> Dict[str, np.ndarray]:
+    query = _select(columns, where, params, connection.capabilities.dialect, limit)
+    _, rows = await connection.execute_query(query, list(params))
+    return _arrays(rows, columns)
+
+
+async def fetch_columns(
+    columns: Sequence[str],
+    where: str = "",
+    params: Sequence = (),
+    limit: Optional[int] = None,
+    connection: Optional[BaseDBAsyncClient] = None,
+) -> Dict[str, np.ndarray]:
+    """Selected `columns` of the matching rows in id order, one array per column."""
+    connection = connection or Tortoise.get_connection("default")
+    if isinstance(connection, AsyncpgDBClient):
+        async with connection.acquire_connection() as raw:
+            return await _fetch_postgres(raw, columns, where, params, limit)
+    return await _fetch_records(connection, columns, where, params, limit)
+
+
+async def _keyset_batches(
+    fetch: Callable[..., Awaitable[Dict[str, np.ndarray]]],
+    columns: Sequence[str],
+    batch_rows: int,
+) -> AsyncIterator[Dict[str, np.ndarray]]:
+    keyed = list(columns) if "id" in columns else ["id"] + list(columns)
+    last_id = 0
+    while True:
+        batch = await fetch(keyed, '"id" > {}', (last_id,), batch_rows)
+        if not len(batch["id"]):
+            return
+        last_id = int(batch["id"][-1])
+        yield {col: batch[col] for col in columns}
+
+
+async def iter_column_batches(
+    columns: Sequence[str],
+    batch_rows: int,
+    connection: Optional[BaseDBAsyncClient] = None,
+) -> AsyncIterator[Dict[str, np.ndarray]]:
+    """The whole table in id order, at most `batch_rows` rows per batch."""
+    connection = connection or Tortoise.get_connection("default")
+    if not isinstance(connection, AsyncpgDBClient):
+        fetch = partial(_fetch_records, connection)
+        async for batch in _keyset_batches(fetch, columns, batch_rows):
+            yield batch
+        return
+
+    # All pages from one read-only snapshot, so batches never overlap or skip rows
+    async with connection.acquire_connection() as raw:
+        async with raw.transaction(isolation="repeatable_read", readonly=True):
+            fetch = partial(_fetch_postgres, raw)
+            async for batch in _keyset_batches(fetch, columns, batch_rows):
+                yield batch
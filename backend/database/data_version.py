@@ -0,0 +1,81 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, NamedTuple, Optional, Tuple
+
+from tortoise import Tortoise
+from tortoise.backends.base.client import BaseDBAsyncClient
+
+# Monotonic version of the transactions data (see migration 0003_data_version).
+# Writers bump it inside their own transaction, so readers never pair a new
+# version with old rows. scores_version only moves when predictions of rows
+# that were already stored change (see 0006_data_version_scores_and_instance).
+
+
+class DataVersions(NamedTuple):
+    instance: str
+    version: int
+    scores_version: int
+
+
+async def bump_data_version(
+    connection: Optional[BaseDBAsyncClient] = None, rescored: bool = False
+):
+    connection = connection or Tortoise.get_connection("default")
+    scores = ', "scores_version" = "scores_version" + 1' if rescored else ""
+    await connection.execute_query(
+        f'UPDATE "data_version" SET "version" = "version" + 1{scores} WHERE "id" = 1'
+    )
+
+
+async def get_data_version(connection: Optional[BaseDBAsyncClient] = None) -> int:
+    connection = connection or Tortoise.get_connection("default")
+    _, rows = await connection.execute_query(
+        'SELECT "version" FROM "data_version" WHERE "id" = 1'
+    )
+    return int(rows[0]["version"]) if rows else 0
+
+
+async def get_data_versions(
+    connection: Optional[BaseDBAsyncClient] = None,
+) -> DataVersions:
+    connection = connection or Tortoise.get_connection("default")
+    _, rows = await connection.execute_query(
+        'SELECT "instance", "version", "scores_version" FROM "data_version" '
+        'WHERE "id" = 1'
+    )
+    if not rows:
+        return DataVersions("", 0, 0)
+    row = rows[0]
+    return DataVersions(
+        row["instance"], int(row["version"]), int(row["scores_version"])
+    )
+
+
+class VersionedCache:
+    """
+    Values computed from the transactions table, kept for the current data
+    version only. Concurrent misses compute once.
+    """
+
+    def __init__(self):
+        self._version: Optional[int] = None
+        self._entries: Dict[Hashable, Any] = {}
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def get(
+        self, key: Hashable, compute: Callable[[], Awaitable[Any]]
+    ) -> Tuple[int, Any, bool]:
+        """Return (data version, value, served from cache)."""
+        version = await get_data_version()
+        if version == self._version and key in self._entries:
+            return version, self._entries[key], True
+        if self._lock is None:
+            # Created lazily so it belongs to the server's event loop
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if version == self._version and key in self._entries:
+                return version, self._entries[key], True
+            value = await compute()
+            if version != self._version:
+                self._version, self._entries = version, {}
+            self._entries[key] = value
+            return version, value, False
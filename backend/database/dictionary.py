@@ -0,0 +1,164 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Type
+
+import numpy as np
+import pandas as pd
+from models.transaction import Category, Merchant
+from tortoise import Tortoise
+from tortoise.backends.base.client import BaseDBAsyncClient
+from tortoise.models import Model
+
+# Dictionary coding of low-cardinality text columns. Transactions store the
+# integer code (category_id, merchant_id); the name <-> code mapping lives in a
+# lookup table mirrored in process. Codes are never reassigned, so the mirror
+# only has to be refreshed when it meets a name or code it does not know yet.
+# Names looked up or added inside a transaction stay in a PendingCodes overlay
+# until it commits, so other requests never see codes that may be rolled back.
+
+LOOKUP_BATCH_ROWS = 5000
+
+
+class Codebook:
+    def __init__(self, model: Type[Model]):
+        self.model = model
+        self.codes: Dict[str, int] = {}
+        self.names = np.empty(0, dtype=object)
+
+    def _remember(self, rows: List[dict]):
+        if not rows:
+            return
+        top = max(row["id"] for row in rows) + 1
+        if top > len(self.names):
+            names = np.empty(top, dtype=object)
+            names[: len(self.names)] = self.names
+            self.names = names
+        for row in rows:
+            self.codes[row["name"]] = row["id"]
+            self.names[row["id"]] = row["name"]
+
+    async def _fetch(
+        self, names: Sequence[str], connection: Optional[BaseDBAsyncClient]
+    ) -> List[dict]:
+        rows = []
+        for start in range(0, len(names), LOOKUP_BATCH_ROWS):
+            query = self.model.filter(name__in=names[start : start + LOOKUP_BATCH_ROWS])
+            rows += await query.using_db(connection).values("id", "name")
+        return rows
+
+    async def load(
+        self,
+        names: Optional[Sequence[str]] = None,
+        connection: Optional[BaseDBAsyncClient] = None,
+    ):
+        if names is None:
+            query = self.model.all()
+            self._remember(await query.using_db(connection).values("id", "name"))
+            return
+        self._remember(await self._fetch(names, connection))
+
+    async def _insert(self, names: List[str], connection: BaseDBAsyncClient):
+        # Concurrent writers may add the same names; the unique index decides
+        dialect = connection.capabilities.dialect
+        placeholder = "$1" if dialect == "postgres" else "?"
+        await connection.execute_many(
+            f'INSERT INTO "{self.model._meta.db_table}" ("name") '
+            f'VALUES ({placeholder}) ON CONFLICT ("name") DO NOTHING',
+            [[name] for name in names],
+        )
+
+    async def encode(
+        self,
+        values: pd.Series,
+        connection: Optional[BaseDBAsyncClient] = None,
+        pending: Optional[Dict[str, int]] = None,
+    ) -> np.ndarray:
+        """
+        Codes for `values`, adding unseen names to the lookup table. Inside a
+        transaction, pass its `pending` codes: names resolved through it are
+        kept there instead of in the shared codebook.
+        """
+        connection = connection or Tortoise.get_connection("default")
+        missing = [
+            name
+            for name in pd.unique(values)
+            if name not in self.codes and (pending is None or name not in pending)
+        ]
+        if missing:
+            rows = await self._fetch(missing, connection)
+            found = {row["name"] for row in rows}
+            unseen = [name for name in missing if name not in found]
+            if unseen:
+                await self._insert(unseen, connection)
+                rows += await self._fetch(unseen, connection)
+            if pending is None:
+                self._remember(rows)
+            else:
+                pending.update((row["name"], row["id"]) for row in rows)
+        codes = values.map(self.codes)
+        if pending is not None and codes.isna().any():
+            codes = codes.fillna(values.map(pending))
+        return codes.to_numpy(dtype="int64")
+
+    def merge(self, pending: Dict[str, int]):
+        # Codes of a committed transaction
+        self._remember([{"id": code, "name": name} for name, code in pending.items()])
+
+    async def decode(
+        self, codes: Iterable[int], connection: Optional[BaseDBAsyncClient] = None
+    ) -> np.ndarray:
+        codes = np.asarray(codes, dtype="int64")
+        if len(codes) and (
+            codes.max() >= len(self.names) or pd.isna(self.names[codes]).any()
+        ):
+            await self.load(connection=connection)
+        return self.names[codes]
+
+
+# Text column -> its codebook; the stored column is "<name>_id"
+CODEBOOKS = {
+    "category": Codebook(Category),
+    "merchant": Codebook(Merchant),
+}
+
+
+def stored_columns(columns: Iterable[str]) -> List[str]:
+    """Map logical column names to the columns stored in `transactions`."""
+    return [f"{col}_id" if col in CODEBOOKS else col for col in columns]
+
+
+class PendingCodes:
+    """Codes resolved inside one transaction, per coded column."""
+
+    def __init__(self):
+        self.codes: Dict[str, Dict[str, int]] = {col: {} for col in CODEBOOKS}
+
+    def commit(self):
+        # Call once the transaction has committed
+        for col, codes in self.codes.items():
+            CODEBOOKS[col].merge(codes)
+
+
+async def encode_columns(
+    df: pd.DataFrame,
+    connection: Optional[BaseDBAsyncClient] = None,
+    pending: Optional[PendingCodes] = None,
+) -> pd.DataFrame:
+    # Adds <name>_id next to each coded text column
+    for col, codebook in CODEBOOKS.items():
+        if col in df:
+            df[f"{col}_id"] = await codebook.encode(
+                df[col], connection, pending.codes[col] if pending else None
+            )
+    return df
+
+
+async def decode_columns(
+    df: pd.DataFrame, connection: Optional[BaseDBAsyncClient] = None
+) -> pd.DataFrame:
+    # Replaces each <name>_id column by the names, in the same position
+    for col, codebook in CODEBOOKS.items():
+        code_col = f"{col}_id"
+        if code_col in df:
+            position = df.columns.get_loc(code_col)
+            names = await codebook.decode(df.pop(code_col), connection)
+            df.insert(position, col, names)
+    return df
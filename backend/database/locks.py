@@ -0,0 +1,25 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from tortoise import Tortoise
+
+# Locks shared by all processes using the database. On PostgreSQL these are
+# session advisory locks, held on a pool connection taken for the duration and
+# released by the server if the process dies. Other backends run in a single
+# process (tests, benchmarks), so the lock is always granted there.
+
+
+@asynccontextmanager
+async def advisory_lock(key: int) -> AsyncIterator[bool]:
+    """Try to take lock `key` without waiting; yields whether it was taken."""
+    client = Tortoise.get_connection("default")
+    if client.capabilities.dialect != "postgres":
+        yield True
+        return
+    async with client.acquire_connection() as connection:
+        taken = await connection.fetchval("SELECT pg_try_advisory_lock($1)", key)
+        try:
+            yield taken
+        finally:
+            if taken:
+                await connection.execute("SELECT pg_advisory_unlock($1)", key)
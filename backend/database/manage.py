@@ -0,0 +1,41 @@
+"""
+Database schema setup, run once per deployment before the API workers start:
+
+    python -m database.manage migrate
+
+Creates missing tables and applies pending migrations (database/migrations.py).
+"""
+
+import argparse
+import asyncio
+
+from database.db import DB_URL, create_schema, tortoise_config
+from logger import logger
+from tortoise import Tortoise
+
+
+async def migrate(db_url: str):
+    config = tortoise_config(db_url)
+    # Migrations of a large table may run longer than an API query should
+    config["connections"]["default"]["credentials"].pop("command_timeout", None)
+    await Tortoise.init(config=config)
+    try:
+        await create_schema()
+        logger.info("Database schema is up to date")
+    finally:
+        await Tortoise.close_connections()
+
+
+COMMANDS = {"migrate": migrate}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    parser.add_argument("--db-url", default=DB_URL)
+    args = parser.parse_args()
+    asyncio.run(COMMANDS[args.command](args.db_url))
+
+
+if __name__ == "__main__":
+    main()
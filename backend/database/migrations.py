@@ -0,0 +1,287 @@
+from config import current_config
+from logger import logger
+from tortoise import Tortoise
+
+# Ordered schema changes for tables that already exist. generate_schemas() only
+# creates missing tables, so constraints and indexes added to the models later
+# are applied here. Each migration runs once and is recorded in schema_migrations.
+
+# strftime directives understood by PostgreSQL's to_timestamp()/to_date()
+_PG_FORMAT_CODES = {
+    "%Y": "YYYY",
+    "%m": "MM",
+    "%d": "DD",
+    "%H": "HH24",
+    "%M": "MI",
+    "%S": "SS",
+}
+
+
+def _pg_format(strftime_format: str) -> str:
+    result = strftime_format
+    for directive, pattern in _PG_FORMAT_CODES.items():
+        result = result.replace(directive, pattern)
+    if "%" in result:
+        raise ValueError(f"Cannot convert {strftime_format!r} for PostgreSQL")
+    return result.replace("'", "''")
+
+
+def _column_check(column: str, condition: str) -> str:
+    return (
+        "EXISTS (SELECT 1 FROM information_schema.columns "
+        f"WHERE table_name = 'transactions' AND column_name = '{column}' "
+        f"AND {condition})"
+    )
+
+
+# Legacy text columns still present (before 0005_transactions_typed_columns)
+_TEXT_CATEGORY = _column_check("category", "TRUE")
+_TEXT_TIMESTAMP = _column_check(
+    "trans_date_trans_time", "data_type <> 'timestamp without time zone'"
+)
+_PG_TIME_FORMAT = _pg_format(current_config.TRANSACTION_TIME_FORMAT)
+_PG_DOB_FORMAT = _pg_format(current_config.DATE_OF_BIRTH_FORMAT)
+
+
+# (name, {dialect: [statements]}); dialects without an entry are skipped.
+# Columns only need migrating on PostgreSQL (SQLite test databases are always
+# created fresh from the models); secondary indexes live here for every dialect.
+MIGRATIONS = [
+    (
+        "0001_transactions_unique_trans_num",
+        {
+            "postgres": [
+                # Keep the oldest copy of any duplicated transaction
+                """
+                DELETE FROM "transactions" a USING "transactions" b
+                WHERE a."trans_num" = b."trans_num" AND a."id" > b."id"
+                """,
+                # Same name as the constraint generate_schemas() creates
+                """
+                CREATE UNIQUE INDEX IF NOT EXISTS "transactions_trans_num_key"
+                ON "transactions" ("trans_num")
+                """,
+            ],
+        },
+    ),
+    (
+        "0002_transactions_stored_predictions",
+        {
+            "postgres": [
+                """
+                ALTER TABLE "transactions"
+                ADD COLUMN IF NOT EXISTS "fraud_score" DOUBLE PRECISION,
+                ADD COLUMN IF NOT EXISTS "predicted_fraud" BOOL,
+                ADD COLUMN IF NOT EXISTS "score_version" VARCHAR(32)
+                """,
+                """
+                CREATE INDEX IF NOT EXISTS "idx_transactions_predicted_fraud"
+                ON "transactions" ("predicted_fraud", "id")
+                """,
+                """
+                CREATE INDEX IF NOT EXISTS "idx_transactions_score_version"
+                ON "transactions" ("score_version")
+                """,
+            ],
+            "sqlite": [
+                """
+                CREATE INDEX IF NOT EXISTS "idx_transactions_predicted_fraud"
+                ON "transactions" ("predicted_fraud", "id")
+                """,
+                """
+                CREATE INDEX IF NOT EXISTS "idx_transactions_score_version"
+                ON "transactions" ("score_version")
+                """,
+            ],
+        },
+    ),
+    (
+        # Single-row counter bumped on every write to transactions; read-side
+        # caches (e.g. /stats) are keyed on it so all workers agree
+        "0003_data_version",
+        {
+            "postgres": [
+                """
+                CREATE TABLE IF NOT EXISTS "data_version" (
+                    "id" INT PRIMARY KEY, "version" BIGINT NOT NULL DEFAULT 0
+                )
+                """,
+                """
+                INSERT INTO "data_version" ("id", "version") VALUES (1, 0)
+                ON CONFLICT ("id") DO NOTHING
+                """,
+            ],
+            "sqlite": [
+                """
+                CREATE TABLE IF NOT EXISTS "data_version" (
+                    "id" INT PRIMARY KEY, "version" BIGINT NOT NULL DEFAULT 0
+                )
+                """,
+                """
+                INSERT OR IGNORE INTO "data_version" ("id", "version") VALUES (1, 0)
+                """,
+            ],
+        },
+    ),
+    (
+        # Keyset pagination of /transactions, optionally filtered on is_fraud
+        "0004_transactions_keyset_indexes",
+        {
+            "postgres": [
+                """
+                CREATE INDEX IF NOT EXISTS "idx_transactions_created_at_id"
+                ON "transactions" ("created_at", "id")
+                """,
+                """
+                CREATE INDEX IF NOT EXISTS "idx_transactions_is_fraud_created_at_id"
+                ON "transactions" ("is_fraud", "created_at", "id")
+                """,
+            ],
+            "sqlite": [
+                """
+                CREATE INDEX IF NOT EXISTS "idx_transactions_created_at_id"
+                ON "transactions" ("created_at", "id")
+                """,
+                """
+                CREATE INDEX IF NOT EXISTS "idx_transactions_is_fraud_created_at_id"
+                ON "transactions" ("is_fraud", "created_at", "id")
+                """,
+            ],
+        },
+    ),
+    (
+        # Typed timestamp/date/zip columns, features stored at ingest and
+        # dictionary-coded category/merchant. SQLite databases are created from
+        # the models directly.
+        "0005_transactions_typed_columns",
+        {
+            "postgres": [
+                # Dictionary-code category and merchant
+                f"""
+                DO $$
+                BEGIN
+                IF {_TEXT_CATEGORY} THEN
+                    INSERT INTO "categories" ("name")
+                    SELECT DISTINCT "category" FROM "transactions"
+                    ON CONFLICT ("name") DO NOTHING;
+                    INSERT INTO "merchants" ("name")
+                    SELECT DISTINCT "merchant" FROM "transactions"
+                    ON CONFLICT ("name") DO NOTHING;
+                    ALTER TABLE "transactions"
+                    ADD COLUMN "category_id" SMALLINT
+                        REFERENCES "categories" ("id") ON DELETE RESTRICT,
+                    ADD COLUMN "merchant_id" INT
+                        REFERENCES "merchants" ("id") ON DELETE RESTRICT;
+                    UPDATE "transactions" t
+                    SET "category_id" = c."id", "merchant_id" = m."id"
+                    FROM "categories" c, "merchants" m
+                    WHERE c."name" = t."category" AND m."name" = t."merchant";
+                    ALTER TABLE "transactions"
+                    DROP COLUMN "category",
+                    DROP COLUMN "merchant",
+                    ALTER COLUMN "category_id" SET NOT NULL,
+                    ALTER COLUMN "merchant_id" SET NOT NULL;
+                END IF;
+                END $$
+                """,
+                # Parse the text columns once, with the configured upload formats
+                f"""
+                DO $$
+                BEGIN
+                IF {_TEXT_TIMESTAMP} THEN
+                    ALTER TABLE "transactions"
+                    ALTER COLUMN "trans_date_trans_time" TYPE TIMESTAMP USING
+                        to_timestamp("trans_date_trans_time",
+                            '{_PG_TIME_FORMAT}')::timestamp,
+                    ALTER COLUMN "dob" TYPE DATE USING
+                        to_date("dob", '{_PG_DOB_FORMAT}'),
+                    ALTER COLUMN "zip" TYPE VARCHAR(10) USING lpad("zip"::text, 5, '0');
+                END IF;
+                END $$
+                """,
+                """
+                ALTER TABLE "transactions"
+                ADD COLUMN IF NOT EXISTS "hour" SMALLINT,
+                ADD COLUMN IF NOT EXISTS "day_of_week" SMALLINT,
+                ADD COLUMN IF NOT EXISTS "month" SMALLINT,
+                ADD COLUMN IF NOT EXISTS "distance" DOUBLE PRECISION
+                """,
+                # Same definitions as ml/features.py (Monday = 0)
+                """
+                UPDATE "transactions" SET
+                    "hour" = EXTRACT(HOUR FROM "trans_date_trans_time"),
+                    "day_of_week" = EXTRACT(ISODOW FROM "trans_date_trans_time") - 1,
+                    "month" = EXTRACT(MONTH FROM "trans_date_trans_time"),
+                    "distance" = sqrt(
+                        ("merch_lat" - "lat") * ("merch_lat" - "lat")
+                        + ("merch_long" - "long") * ("merch_long" - "long")
+                    )
+                WHERE "hour" IS NULL
+                """,
+                """
+                ALTER TABLE "transactions"
+                ALTER COLUMN "hour" SET NOT NULL,
+                ALTER COLUMN "day_of_week" SET NOT NULL,
+                ALTER COLUMN "month" SET NOT NULL,
+                ALTER COLUMN "distance" SET NOT NULL
+                """,
+            ],
+        },
+    ),
+    (
+        "0006_data_version_scores_and_instance",
+        {
+            # instance tells copies of the data apart (e.g. a recreated
+            # database) whose versions happen to be equal
+            "postgres": [
+                """
+                ALTER TABLE "data_version"
+                ADD COLUMN IF NOT EXISTS "scores_version" BIGINT NOT NULL DEFAULT 0,
+                ADD COLUMN IF NOT EXISTS "instance" VARCHAR(32)
+                """,
+                """
+                UPDATE "data_version" SET "instance" = md5(random()::text)
+                WHERE "instance" IS NULL
+                """,
+            ],
+            "sqlite": [
+                """
+                ALTER TABLE "data_version"
+                ADD COLUMN "scores_version" BIGINT NOT NULL DEFAULT 0
+                """,
+                """
+                ALTER TABLE "data_version" ADD COLUMN "instance" VARCHAR(32)
+                """,
+                """
+                UPDATE "data_version" SET "instance" = lower(hex(randomblob(16)))
+                """,
+            ],
+        },
+    ),
+]
+
+
+async def apply_migrations(connection_name: str = "default"):
+    connection = Tortoise.get_connection(connection_name)
+    dialect = connection.capabilities.dialect
+
+    await connection.execute_script(
+        'CREATE TABLE IF NOT EXISTS "schema_migrations" ('
+        '"name" VARCHAR(100) PRIMARY KEY, '
+        '"applied_at" TIMESTAMP DEFAULT CURRENT_TIMESTAMP)'
+    )
+    _, rows = await connection.execute_query('SELECT "name" FROM "schema_migrations"')
+    applied = {row["name"] for row in rows}
+
+    for name, statements in MIGRATIONS:
+        if name in applied:
+            continue
+        for statement in statements.get(dialect, []):
+            await connection.execute_script(statement)
+        await connection.execute_insert(
+            'INSERT INTO "schema_migrations" ("name") VALUES ('
+            + ("$1" if dialect == "postgres" else "?")
+            + ")",
+            [name],
+        )
+        logger.info(f"Applied migration {name}")
@@ -0,0 +1,84 @@
+import time
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+import asyncpg
+from tortoise import Tortoise
+from tortoise.backends.asyncpg import AsyncpgDBClient
+from tortoise.exceptions import ConfigurationError
+
+# Tortoise engine for PostgreSQL (see database/db.py): the asyncpg client, with
+# a pool that records how long callers wait for a connection. Together with the
+# pool's size and idle count this shows whether DB_POOL_MAX_SIZE fits the load.
+
+
+@dataclass
+class PoolWaits:
+    acquired: int = 0
+    # Callers waiting for a connection right now
+    waiting: int = 0
+    wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+
+
+class InstrumentedPool:
+    # asyncpg pool whose acquire() is timed; everything else is the pool's own
+    def __init__(self, pool: asyncpg.Pool, waits: PoolWaits):
+        self._pool = pool
+        self.waits = waits
+
+    async def acquire(self, *, timeout: Optional[float] = None):
+        started = time.perf_counter()
+        self.waits.waiting += 1
+        try:
+            connection = await self._pool.acquire(timeout=timeout)
+        finally:
+            self.waits.waiting -= 1
+        waited = time.perf_counter() - started
+        self.waits.acquired += 1
+        self.waits.wait_seconds += waited
+        self.waits.max_wait_seconds = max(self.waits.max_wait_seconds, waited)
+        return connection
+
+    def __getattr__(self, name: str):
+        return getattr(self._pool, name)
+
+
+class InstrumentedAsyncpgClient(AsyncpgDBClient):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Kept across pool re-creation
+        self.waits = PoolWaits()
+
+    async def create_pool(self, **kwargs) -> InstrumentedPool:
+        return InstrumentedPool(await super().create_pool(**kwargs), self.waits)
+
+    def pool_stats(self) -> Optional[dict]:
+        if self._pool is None:
+            return None
+        size, idle = self._pool.get_size(), self._pool.get_idle_size()
+        max_size = self._pool.get_max_size()
+        return {
+            "min_size": self._pool.get_min_size(),
+            "max_size": max_size,
+            "size": size,
+            "idle": idle,
+            "in_use": size - idle,
+            "utilization": round((size - idle) / max_size, 3),
+            **asdict(self.waits),
+        }
+
+
+client_class = InstrumentedAsyncpgClient
+
+
+def pool_stats() -> Optional[dict]:
+    """Size, use and acquire waits of the default connection's pool, if it has one."""
+    try:
+        connection = Tortoise.get_connection("default")
+    except ConfigurationError:
+        # Tortoise.init() has not run yet
+        return None
+    if isinstance(connection, InstrumentedAsyncpgClient):
+        return connection.pool_stats()
+    return None
@@ -0,0 +1,354 @@
+import asyncio
+import fcntl
+import json
+import os
+import uuid
+from functools import lru_cache
+from typing import AsyncIterator, Dict, List, Optional, Sequence
+
+import pyarrow as pa
+from config import current_config
+from database.data_version import DataVersions, get_data_versions
+from fastapi.concurrency import run_in_threadpool
+from logger import logger
+from ml.scoring import SCORE_COLUMNS
+from models.transaction import TimestampField, Transaction
+from tortoise import Tortoise, fields
+from tortoise.backends.asyncpg import AsyncpgDBClient
+
+# Columnar copy of the transactions table as Arrow IPC files, opened through
+# memory maps so readers share the page cache and never copy the columns they
+# do not use. Stored rows never change, so new rows are appended as another row
+# segment. Predictions live in score segments aligned with the row segments;
+# those are rewritten only when the rescorer changes rows that were already
+# stored. Each refresh reads one consistent view of the table and is recorded
+# in manifest.json together with the data version it reflects.
+
+MANIFEST = "manifest.json"
+LOCK_FILE = ".lock"
+
+# Checked in order, so subclasses come before their base. TimestampField is
+# wall-clock time without a zone, like the TIMESTAMP column it reads.
+_ARROW_TYPES = [
+    (TimestampField, pa.timestamp("us")),
+    (fields.DatetimeField, pa.timestamp("us", tz="UTC")),
+    (fields.DateField, pa.date32()),
+    (fields.SmallIntField, pa.int16()),
+    (fields.BigIntField, pa.int64()),
+    (fields.IntField, pa.int32()),
+    (fields.FloatField, pa.float64()),
+    (fields.BooleanField, pa.bool_()),
+    (fields.CharField, pa.string()),
+]
+
+
+def _arrow_type(field: fields.Field) -> pa.DataType:
+    for field_type, arrow_type in _ARROW_TYPES:
+        if isinstance(field, field_type):
+            return arrow_type
+    raise TypeError(f"No Arrow type for {type(field).__name__}")
+
+
+@lru_cache(maxsize=None)
+def table_schema() -> pa.Schema:
+    """Stored columns of `transactions`, in the order Transaction.values() returns them."""
+    # Foreign key columns only exist once Tortoise.init() has run
+    meta = Transaction._meta
+    return pa.schema(
+        [
+            pa.field(column, _arrow_type(meta.fields_map[name]))
+            for name, column in meta.fields_db_projection.items()
+        ]
+    )
+
+
+def _manifest_columns() -> List[str]:
+    # Names and types: segments written with other types are not reused
+    return [f"{field.name} {field.type}" for field in table_schema()]
+
+
+def _row_columns() -> List[str]:
+    # Row segments start with "id"; reads are keyed on it
+    return [col for col in table_schema().names if col not in SCORE_COLUMNS]
+
+
+# -----------------------------------------------
+# Consistent reads
+# -----------------------------------------------
+class _PostgresReader:
+    # One REPEATABLE READ transaction: every query sees the same table state
+    def __init__(self, raw):
+        self.raw = raw
+
+    async def versions(self) -> DataVersions:
+        row = await self.raw.fetchrow(
+            'SELECT "instance", "version", "scores_version" FROM "data_version" '
+            'WHERE "id" = 1'
+        )
+        return DataVersions(*row)
+
+    async def count_upto(self, last_id: int) -> int:
+        table = Transaction._meta.db_table
+        return await self.raw.fetchval(
+            f'SELECT COUNT(*) FROM "{table}" WHERE "id" <= $1', last_id
+        )
+
+    async def batches(
+        self, columns: List[str], after_id: int, batch_rows: int
+    ) -> AsyncIterator[List[list]]:
+        table = Transaction._meta.db_table
+        names = ", ".join(f'"{col}"' for col in columns)
+        cursor = await self.raw.cursor(
+            f'SELECT {names} FROM "{table}" WHERE "id" > $1 ORDER BY "id"', after_id
+        )
+        while True:
+            rows = await cursor.fetch(batch_rows)
+            if not rows:
+                return
+            yield [list(values) for values in zip(*rows)]
+
+
+class _OrmReader:
+    # SQLite has a single writer, and rows are committed in id order
+    async def versions(self) -> DataVersions:
+        return await get_data_versions()
+
+    async def count_upto(self, last_id: int) -> int:
+        return await Transaction.filter(id__lte=last_id).count()
+
+    async def batches(
+        self, columns: List[str], after_id: int, batch_rows: int
+    ) -> AsyncIterator[List[list]]:
+        while True:
+            rows = (
+                await Transaction.filter(id__gt=after_id)
+                .order_by("id")
+                .limit(batch_rows)
+                .values(*columns)
+            )
+            if not rows:
+                return
+            after_id = rows[-1]["id"]
+            yield [[row[col] for row in rows] for col in columns]
+
+
+class _Segment:
+    # Arrow IPC file written batch by batch, renamed into place when complete
+    def __init__(self, directory: str, kind: str, columns: List[str]):
+        self.schema = pa.schema([table_schema().field(col) for col in columns])
+        self.name = f"{kind}-{uuid.uuid4().hex}.arrow"
+        self.path = os.path.join(directory, self.name)
+        self.rows = 0
+        self._writer = pa.ipc.new_file(f"{self.path}.tmp", self.schema)
+
+    def write(self, values: List[list]):
+        arrays = [
+            pa.array(column, type=field.type)
+            for column, field in zip(values, self.schema)
+        ]
+        self._writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+        self.rows += len(values[0])
+
+    def close(self) -> Optional[str]:
+        self._writer.close()
+        if not self.rows:
+            os.remove(f"{self.path}.tmp")
+            return None
+        os.replace(f"{self.path}.tmp", self.path)
+        return self.name
+
+
+# -----------------------------------------------
+# Snapshot
+# -----------------------------------------------
+def _matches(manifest: dict, versions: DataVersions) -> bool:
+    return (manifest["instance"], manifest["version"]) == versions[:2]
+
+
+class TransactionSnapshot:
+    """
+    Arrow snapshot of the transactions table in `directory`, brought up to date
+    with the current data version on read.
+    """
+
+    def __init__(self, directory: str, batch_rows: int):
+        self.directory = directory
+        self.batch_rows = batch_rows
+        self._manifest: Optional[dict] = None
+        self._tables: Dict[str, pa.Table] = {}
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _read_manifest(self) -> Optional[dict]:
+        try:
+            with open(self._path(MANIFEST)) as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        # Written by another schema version of this code
+        if manifest.get("columns") != _manifest_columns():
+            return None
+        return manifest
+
+    def _write_manifest(self, manifest: dict):
+        tmp_path = self._path(f"{MANIFEST}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self._path(MANIFEST))
+
+    def _remove_unused(self, manifest: dict):
+        # Processes still mapping a removed file keep reading it until they close
+        # it; .tmp files are left over from failed refreshes
+        used = set(manifest["row_files"]) | set(manifest["score_files"])
+        for name in os.listdir(self.directory):
+            if name.endswith((".arrow", ".tmp")) and name not in used:
+                os.remove(self._path(name))
+
+    async def refresh(self) -> dict:
+        """Return the manifest of a snapshot matching the current data version."""
+        versions = await get_data_versions()
+        if self._manifest is not None and _matches(self._manifest, versions):
+            return self._manifest
+        if self._lock is None:
+            # Created lazily so it belongs to the running event loop
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            # Other processes share the directory; one of them refreshes at a time
+            lock_file = open(self._path(LOCK_FILE), "w")
+            try:
+                await run_in_threadpool(fcntl.flock, lock_file, fcntl.LOCK_EX)
+                self._manifest = await self._update(self._read_manifest())
+            finally:
+                lock_file.close()
+        return self._manifest
+
+    async def _update(self, manifest: Optional[dict]) -> dict:
+        connection = Tortoise.get_connection("default")
+        if isinstance(connection, AsyncpgDBClient):
+            async with connection.acquire_connection() as raw:
+                async with raw.transaction(isolation="repeatable_read", readonly=True):
+                    return await self._sync(_PostgresReader(raw), manifest)
+        return await self._sync(_OrmReader(), manifest)
+
+    async def _sync(self, reader, manifest: Optional[dict]) -> dict:
+        versions = await reader.versions()
+        if manifest is not None and _matches(manifest, versions):
+            return manifest
+        # Rows at or below last_id only change when they are deleted (replace
+        # upload) or the database is another one; then the snapshot starts over
+        if manifest is not None and (
+            manifest["instance"] != versions.instance
+            or manifest["rows"] != await reader.count_upto(manifest["last_id"])
+        ):
+            manifest = None
+        if manifest is None:
+            manifest = {
+                "columns": _manifest_columns(),
+                "rows": 0,
+                "last_id": 0,
+                "row_files": [],
+                "score_files": [],
+                "scores_version": None,
+            }
+        rescore = manifest["scores_version"] != versions.scores_version
+        # Scores of new rows come with them unless all scores are read again
+        with_scores = not rescore or manifest["last_id"] == 0
+
+        row_columns = _row_columns()
+        rows = _Segment(self.directory, "rows", row_columns)
+        scores = _Segment(self.directory, "scores", SCORE_COLUMNS)
+        columns = row_columns + (SCORE_COLUMNS if with_scores else [])
+        last_id = manifest["last_id"]
+        async for values in reader.batches(columns, last_id, self.batch_rows):
+            rows.write(values[: len(row_columns)])
+            if with_scores:
+                scores.write(values[len(row_columns) :])
+            last_id = values[0][-1]
+        row_files = manifest["row_files"] + [name for name in [rows.close()] if name]
+
+        if with_scores:
+            score_files = manifest["score_files"] + [
+                name for name in [scores.close()] if name
+            ]
+        else:
+            # The rescorer changed stored predictions: read the score columns again
+            scores.close()
+            scores = _Segment(self.directory, "scores", SCORE_COLUMNS)
+            columns = ["id"] + SCORE_COLUMNS
+            async for values in reader.batches(columns, 0, self.batch_rows):
+                scores.write(values[1:])
+            score_files = [name for name in [scores.close()] if name]
+
+        manifest = {
+            "columns": _manifest_columns(),
+            "instance": versions.instance,
+            "version": versions.version,
+            "scores_version": versions.scores_version,
+            "rows": manifest["rows"] + rows.rows,
+            "last_id": last_id,
+            "row_files": row_files,
+            "score_files": score_files,
+        }
+        self._write_manifest(manifest)
+        self._remove_unused(manifest)
+        logger.info(
+            f"Snapshot at data version {versions.version}: {manifest['rows']} rows, "
+            f"{rows.rows} new, scores {'appended' if with_scores else 're-read'}."
+        )
+        return manifest
+
+    # -----------------------------------------------
+    # Reads
+    # -----------------------------------------------
+    def _open(self, name: str) -> pa.Table:
+        table = self._tables.get(name)
+        if table is None:
+            source = pa.memory_map(self._path(name), "r")
+            table = self._tables[name] = pa.ipc.open_file(source).read_all()
+        return table
+
+    def _read(self, manifest: dict, columns: Sequence[str]) -> pa.Table:
+        used = set(manifest["row_files"]) | set(manifest["score_files"])
+        self._tables = {name: t for name, t in self._tables.items() if name in used}
+
+        tables = []
+        for files, group in (
+            (manifest["row_files"], _row_columns()),
+            (manifest["score_files"], SCORE_COLUMNS),
+        ):
+            wanted = [col for col in columns if col in group]
+            if wanted:
+                schema = pa.schema([table_schema().field(col) for col in wanted])
+                parts = [self._open(name).select(wanted) for name in files]
+                tables.append(
+                    pa.concat_tables(parts) if parts else schema.empty_table()
+                )
+
+        table = tables[0]
+        for other in tables[1:]:
+            for field, column in zip(other.schema, other.columns):
+                table = table.append_column(field, column)
+        return table.select(list(columns))
+
+    async def table(self, columns: Optional[Sequence[str]] = None) -> pa.Table:
+        """
+        Current rows with the stored `columns` (all by default), in id order.
+        Columns are zero-copy views of the memory-mapped files.
+        """
+        columns = list(columns or table_schema().names)
+        manifest = await self.refresh()
+        try:
+            return self._read(manifest, columns)
+        except FileNotFoundError:
+            # Replaced by a refresh in another process since our last look
+            self._manifest = None
+            return self._read(await self.refresh(), columns)
+
+
+transaction_snapshot = TransactionSnapshot(
+    current_config.SNAPSHOT_DIR, current_config.SNAPSHOT_BATCH_ROWS
+)
@@ -0,0 +1,104 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from database.data_version import VersionedCache
+from database.dictionary import decode_columns
+from models.transaction import Transaction
+from tortoise import Tortoise
+from tortoise.backends.base.client import BaseDBAsyncClient
+
+# Dashboard aggregates computed in the database with GROUP BY; only the grouped
+# counts travel to the API. Results are cached per data version.
+
+COUNT_COLUMNS = ["total", "fraud", "predicted_fraud", "scored"]
+
+# Bool columns are summed through CASE so PostgreSQL and SQLite agree
+_COUNTS = (
+    'COUNT(*) AS "total", '
+    'SUM(CASE WHEN "is_fraud" THEN 1 ELSE 0 END) AS "fraud", '
+    'SUM(CASE WHEN "predicted_fraud" THEN 1 ELSE 0 END) AS "predicted_fraud", '
+    'COUNT("score_version") AS "scored"'
+)
+
+TIME_DIMENSIONS = {
+    "hour": range(24),
+    "day_of_week": range(7),
+    "month": range(1, 13),
+}
+
+
+# -----------------------------
+# Queries
+# -----------------------------
+async def _grouped(
+    connection: BaseDBAsyncClient,
+    column: str,
+    keys: Optional[range] = None,
+    order_limit: Optional[Tuple[str, int]] = None,
+) -> pd.DataFrame:
+    # Counts per value of `column`; `keys` adds zero rows for missing values
+    table = Transaction._meta.db_table
+    query = f'SELECT "{column}", {_COUNTS} FROM "{table}" GROUP BY "{column}"'
+    if order_limit is not None:
+        order, limit = order_limit
+        query += f" ORDER BY {order} LIMIT {int(limit)}"
+    _, rows = await connection.execute_query(query)
+    df = pd.DataFrame([dict(row) for row in rows], columns=[column] + COUNT_COLUMNS)
+    if keys is not None:
+        df = df.set_index(column).reindex(keys).rename_axis(column).reset_index()
+    # SUM over zero rows is NULL
+    df[COUNT_COLUMNS] = df[COUNT_COLUMNS].fillna(0).astype("int64")
+    return df
+
+
+def _records(df: pd.DataFrame, key: str) -> List[dict]:
+    df = df.copy()
+    df["fraud_rate"] = np.where(df["total"] > 0, df["fraud"] / df["total"].clip(1), 0)
+    df["predicted_fraud_rate"] = np.where(
+        df["scored"] > 0, df["predicted_fraud"] / df["scored"].clip(1), 0
+    )
+    df[["fraud_rate", "predicted_fraud_rate"]] = df[
+        ["fraud_rate", "predicted_fraud_rate"]
+    ].round(6)
+    return df.rename(columns={key: "key"})[
+        ["key"] + COUNT_COLUMNS + ["fraud_rate", "predicted_fraud_rate"]
+    ].to_dict(orient="records")
+
+
+async def compute_stats(
+    merchants: int, connection: Optional[BaseDBAsyncClient] = None
+) -> dict:
+    connection = connection or Tortoise.get_connection("default")
+    category = await decode_columns(
+        await _grouped(connection, "category_id"), connection
+    )
+    merchant = await decode_columns(
+        await _grouped(
+            connection,
+            "merchant_id",
+            order_limit=(
+                '"predicted_fraud" DESC, "fraud" DESC, "total" DESC',
+                merchants,
+            ),
+        ),
+        connection,
+    )
+
+    totals = category[COUNT_COLUMNS].sum()
+    stats = {
+        "totals": {col: int(totals[col]) for col in COUNT_COLUMNS},
+        "category": _records(
+            category.sort_values("predicted_fraud", ascending=False), "category"
+        ),
+        "merchant": _records(merchant, "merchant"),
+    }
+    # hour/day_of_week/month are stored columns, grouped like any other
+    for dimension, keys in TIME_DIMENSIONS.items():
+        stats[dimension] = _records(
+            await _grouped(connection, dimension, keys), dimension
+        )
+    return stats
+
+
+stats_cache = VersionedCache()
@@ -1,22 +1,144 @@
+import atexit
+import json
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+import random
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Optional
+
+from config import current_config
 
 # Ensure logs directory exists
 if not os.path.exists("logs"):
     os.makedirs("logs")
 
+# Log calls only put the record on a queue; a background thread formats it and
+# writes it to the console and the rotating file, so request handlers never wait
+# on log I/O. Messages are formatted on that thread too: pass values that are not
+# modified afterwards. Structured values go in extra={"fields": {...}}.
+
+
+# -----------------------------------------------
+# Formatting
+# -----------------------------------------------
+def _truncate(text: str, limit: int) -> str:
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [{len(text) - limit} more characters]"
+
+
+class CappedFormatter(logging.Formatter):
+    # Text lines; the message is cut to `max_chars`
+    def __init__(self, fmt: str, max_chars: int):
+        super().__init__(fmt)
+        self.max_chars = max_chars
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        record.message = _truncate(record.message, self.max_chars)
+        return super().formatMessage(record)
+
+
+class JsonFormatter(logging.Formatter):
+    # One JSON object per line; the message and string fields are cut to `max_chars`
+    def __init__(self, max_chars: int):
+        super().__init__()
+        self.max_chars = max_chars
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": _truncate(record.getMessage(), self.max_chars),
+        }
+        for key, value in getattr(record, "fields", {}).items():
+            if isinstance(value, str):
+                value = _truncate(value, self.max_chars)
+            entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+# -----------------------------------------------
+# Sampling and queueing
+# -----------------------------------------------
+def parse_sampling(spec: str) -> Dict[str, float]:
+    # "FRAUDetective.predict=0.01,..." -> {logger name: fraction of records kept}
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, rate = item.partition("=")
+        rates[name.strip()] = float(rate)
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a fraction of the records below WARNING from the configured loggers
+    and their children; the most specific configured name applies.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def _rate(self, name: str) -> Optional[float]:
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition(".")[0]
+        return None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        return rate is None or random.random() < rate
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Queues records without formatting them; the stock handler formats the
+    message first. Records that do not fit in a full queue are dropped.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # A traceback cannot be rendered later, once its frames are gone
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
 # Configure logging
 logger = logging.getLogger("FRAUDetective")
 logger.setLevel(logging.DEBUG)
 
 # Log format
-formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+if current_config.LOG_FORMAT == "json":
+    formatter = JsonFormatter(current_config.LOG_MAX_MESSAGE_CHARS)
+else:
+    formatter = CappedFormatter(
+        "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        current_config.LOG_MAX_MESSAGE_CHARS,
+    )
 
 # Console Handler (prints logs to the terminal)
 console_handler = logging.StreamHandler()
 console_handler.setFormatter(formatter)
-console_handler.setLevel(logging.DEBUG)
+console_handler.setLevel(current_config.LOG_LEVEL.upper())
 
 # File Handler (stores logs in a rotating file)
 file_handler = RotatingFileHandler(
@@ -25,6 +147,31 @@ file_handler = RotatingFileHandler(
 file_handler.setFormatter(formatter)
 file_handler.setLevel(logging.INFO)
 
+# Both handlers run on the listener's thread
+log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(current_config.LOG_QUEUE_SIZE)
+queue_handler = DeferredQueueHandler(log_queue)
+queue_handler.setLevel(min(console_handler.level, file_handler.level))
+queue_handler.addFilter(SamplingFilter(parse_sampling(current_config.LOG_SAMPLING)))
+listener = QueueListener(
+    log_queue, console_handler, file_handler, respect_handler_level=True
+)
+listener.start()
+
+
+def _restart_listener():
+    # A forked child (e.g. a gunicorn worker) has the queue but not the thread
+    global log_queue, listener
+    log_queue = queue.Queue(current_config.LOG_QUEUE_SIZE)
+    queue_handler.queue = log_queue
+    listener = QueueListener(
+        log_queue, console_handler, file_handler, respect_handler_level=True
+    )
+    listener.start()
+
+
+os.register_at_fork(after_in_child=_restart_listener)
+# Flush what is still queued when the process exits
+atexit.register(lambda: listener.stop())
+
 # Add handlers to logger
-logger.addHandler(console_handler)
-logger.addHandler(file_handler)
+logger.addHandler(queue_handler)
@@ -0,0 +1,129 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from config import current_config
+from logger import logger
+from ml.registry import LoadedModel, model_registry
+from ml.scoring import score_frame
+
+
+@dataclass
+class _Request:
+    records: List[dict]
+    future: asyncio.Future = field(repr=False)
+
+    def fail(self, error: Exception):
+        if not self.future.done():
+            self.future.set_exception(error)
+
+
+@dataclass
+class BatchResult:
+    version: str
+    scores: np.ndarray
+    predicted: np.ndarray
+
+
+def _score_records(records: List[dict]) -> Tuple[LoadedModel, np.ndarray, np.ndarray]:
+    loaded = model_registry.get()
+    score, predicted = score_frame(loaded, pd.DataFrame.from_records(records))
+    return loaded, score, predicted
+
+
+# -----------------------------------------------
+# Dynamic micro-batcher
+# -----------------------------------------------
+class DynamicBatcher:
+    """
+    Coalesces concurrent scoring requests. The worker takes the first queued
+    request, keeps collecting for at most `max_wait_ms` or until
+    `max_batch_size` records are gathered, then scores the whole batch with one
+    vectorized model call. Requests arriving while a batch is scored form the
+    next batch. If that call fails, the requests are scored one by one.
+    """
+
+    def __init__(self, max_batch_size: int, max_wait_ms: float):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    async def submit(self, records: List[dict]) -> BatchResult:
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_Request(records, future))
+        return await future
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+
+    async def _collect(self) -> List[_Request]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        size = len(batch[0].records)
+        deadline = loop.time() + self.max_wait
+
+        while size < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                request = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            batch.append(request)
+            size += len(request.records)
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            try:
+                await self._score(batch)
+            except Exception as e:
+                records = sum(len(request.records) for request in batch)
+                logger.error(f"Scoring batch of {records} failed: {e}")
+                if len(batch) == 1:
+                    batch[0].fail(e)
+                    continue
+                # Score each request on its own, so only a bad one gets the error
+                for request in batch:
+                    try:
+                        await self._score([request])
+                    except Exception as e:
+                        request.fail(e)
+
+    async def _score(self, batch: List[_Request]):
+        records = [record for request in batch for record in request.records]
+        loaded, scores, predicted = await asyncio.get_running_loop().run_in_executor(
+            None, _score_records, records
+        )
+        start = 0
+        for request in batch:
+            stop = start + len(request.records)
+            if not request.future.done():
+                request.future.set_result(
+                    BatchResult(
+                        loaded.version, scores[start:stop], predicted[start:stop]
+                    )
+                )
+            start = stop
+
+
+score_batcher = DynamicBatcher(
+    current_config.SCORE_MAX_BATCH_SIZE, current_config.SCORE_MAX_WAIT_MS
+)
@@ -0,0 +1,142 @@
+from typing import AsyncIterator, Dict, Tuple
+
+import numpy as np
+import pandas as pd
+from config import current_config
+from database.columnar import iter_column_batches
+from database.dictionary import decode_columns, stored_columns
+from database.snapshot import transaction_snapshot
+from ml.features import FEATURE_COLUMNS, feature_transformer
+
+# Training data access that never holds the whole table: rows are streamed in
+# id order and turned into model features one batch at a time. Derived features
+# are stored at ingest, so a batch is a plain column select decoded straight into
+# arrays (database/columnar.py). With the snapshot enabled the batches are
+# slices of its memory-mapped Arrow files instead.
+
+LABEL_COLUMN = "is_fraud"
+TRAINING_COLUMNS = stored_columns(FEATURE_COLUMNS) + [LABEL_COLUMN]
+
+
+# -----------------------------------------------
+# Streaming reads
+# -----------------------------------------------
+async def _database_batches(batch_rows: int) -> AsyncIterator[pd.DataFrame]:
+    async for batch in iter_column_batches(TRAINING_COLUMNS, batch_rows):
+        yield pd.DataFrame(batch, copy=False)
+
+
+async def _snapshot_batches(batch_rows: int) -> AsyncIterator[pd.DataFrame]:
+    table = await transaction_snapshot.table(TRAINING_COLUMNS)
+    for batch in table.to_batches(max_chunksize=batch_rows):
+        yield batch.to_pandas()
+
+
+async def iter_feature_batches(
+    batch_rows: int,
+) -> AsyncIterator[Tuple[pd.DataFrame, np.ndarray]]:
+    """Yield (features, labels) per batch of at most `batch_rows` transactions."""
+    if current_config.SNAPSHOT_ENABLED:
+        batches = _snapshot_batches(batch_rows)
+    else:
+        batches = _database_batches(batch_rows)
+    async for batch in batches:
+        batch = await decode_columns(batch)
+        X = feature_transformer.transform(batch)
+        y = batch[LABEL_COLUMN].to_numpy(dtype=bool).astype("int64")
+        yield X, y
+
+
+# -----------------------------------------------
+# Bounded samples
+# -----------------------------------------------
+class _Reservoir:
+    # Algorithm R over column arrays; replacements are drawn per batch
+    def __init__(self, capacity: int, rng: np.random.Generator):
+        self.capacity = capacity
+        self.rng = rng
+        self.seen = 0
+        self.size = 0
+        self.columns: Dict[str, np.ndarray] = {}
+
+    def add(self, batch: Dict[str, np.ndarray], count: int):
+        if count == 0 or self.capacity == 0:
+            self.seen += count
+            return
+        if not self.columns:
+            self.columns = {
+                name: np.empty(self.capacity, dtype=values.dtype)
+                for name, values in batch.items()
+            }
+
+        # Fill free slots first
+        take = min(self.capacity - self.size, count)
+        for name, values in batch.items():
+            self.columns[name][self.size : self.size + take] = values[:take]
+        self.size += take
+
+        # Row i of the rest is the (seen + take + i + 1)-th row of its class and
+        # replaces a random slot with probability capacity / that count.
+        rest = count - take
+        if rest:
+            positions = self.seen + take + np.arange(1, rest + 1)
+            slots = (self.rng.random(rest) * positions).astype("int64")
+            keep = slots < self.capacity
+            rows = np.nonzero(keep)[0] + take
+            slots = slots[keep]
+            # If a slot is hit twice in one batch the later row wins
+            _, last = np.unique(slots[::-1], return_index=True)
+            rows, slots = rows[::-1][last], slots[::-1][last]
+            for name, values in batch.items():
+                self.columns[name][slots] = values[rows]
+        self.seen += count
+
+    def frame(self) -> Dict[str, np.ndarray]:
+        return {name: values[: self.size] for name, values in self.columns.items()}
+
+
+class StratifiedReservoir:
+    """
+    Uniform sample of at most `max_rows` labelled rows, drawn per class. Fraud
+    rows are rare, so the minority class is kept in full up to half the budget
+    and the majority class fills the rest of it.
+    """
+
+    def __init__(self, max_rows: int, seed: int = 42):
+        self.rng = np.random.default_rng(seed)
+        self.max_rows = max_rows
+        self.positive = _Reservoir(max_rows // 2, self.rng)
+        # Sized for the whole budget since the positive count is only known at
+        # the end; trimmed down in sample()
+        self.negative = _Reservoir(max_rows, self.rng)
+
+    @property
+    def seen(self) -> int:
+        return self.positive.seen + self.negative.seen
+
+    def add(self, X: pd.DataFrame, y: np.ndarray):
+        is_fraud = y.astype(bool)
+        for reservoir, mask in ((self.positive, is_fraud), (self.negative, ~is_fraud)):
+            rows = {name: X[name].to_numpy()[mask] for name in FEATURE_COLUMNS}
+            reservoir.add(rows, int(mask.sum()))
+
+    def sample(self) -> Tuple[pd.DataFrame, np.ndarray]:
+        positive = self.positive.frame()
+        negative = self.negative.frame()
+        room = self.max_rows - self.positive.size
+        if self.negative.size > room:
+            # A uniform subset of a uniform sample is still uniform
+            keep = np.sort(self.rng.choice(self.negative.size, room, replace=False))
+            negative = {name: values[keep] for name, values in negative.items()}
+        parts = [part for part in (positive, negative) if part]
+        if not parts:
+            return pd.DataFrame(columns=FEATURE_COLUMNS), np.empty(0, dtype="int64")
+        X = pd.DataFrame(
+            {
+                name: np.concatenate([part[name] for part in parts])
+                for name in FEATURE_COLUMNS
+            }
+        )
+        y = np.zeros(len(X), dtype="int64")
+        y[: self.positive.size] = 1
+        return X, y
@@ -0,0 +1,162 @@
+import zlib
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.model_selection import StratifiedKFold
+
+# Compact encoders for high-cardinality categoricals (HIGH_CARDINALITY_FEATURES
+# in ml/features.py), used by build_pipeline instead of one-hot encoding. Each
+# learns one lookup table per column when fitted; transforming is a table
+# lookup per value, and the output has one column per input column (frequency,
+# target) or a fixed number of buckets (hashed).
+
+
+def _columns(X) -> List[np.ndarray]:
+    if isinstance(X, pd.DataFrame):
+        return [X[name].to_numpy() for name in X.columns]
+    X = np.asarray(X)
+    return [X[:, i] for i in range(X.shape[1])]
+
+
+class _LookupEncoder(TransformerMixin, BaseEstimator):
+    """
+    Replaces each category by a number from a table learned in fit();
+    categories not seen in fit() get `default_`.
+    """
+
+    def _tables(self, columns: List[np.ndarray], y) -> Tuple[List[dict], float]:
+        raise NotImplementedError
+
+    def fit(self, X, y=None):
+        columns = _columns(X)
+        self.n_features_in_ = len(columns)
+        self.tables_, self.default_ = self._tables(columns, y)
+        return self
+
+    def transform(self, X) -> np.ndarray:
+        return self._encode(_columns(X), self.tables_, self.default_)
+
+    @staticmethod
+    def _encode(
+        columns: List[np.ndarray], tables: List[dict], default: float
+    ) -> np.ndarray:
+        encoded = np.empty((len(columns[0]) if columns else 0, len(columns)))
+        for i, (values, table) in enumerate(zip(columns, tables)):
+            encoded[:, i] = pd.Series(values).map(table).fillna(default).to_numpy()
+        return encoded
+
+    def get_feature_names_out(self, input_features=None) -> np.ndarray:
+        if input_features is None:
+            input_features = [f"x{i}" for i in range(self.n_features_in_)]
+        return np.asarray(input_features, dtype=object)
+
+
+class FrequencyEncoder(_LookupEncoder):
+    # Share of the training rows with the category
+    def _tables(self, columns, y):
+        tables = [
+            pd.Series(values).value_counts(normalize=True).to_dict()
+            for values in columns
+        ]
+        return tables, 0.0
+
+
+class TargetEncoder(_LookupEncoder):
+    """
+    Fraud rate of the category, shrunk towards the overall rate by `smoothing`
+    pseudo-rows so rare merchants are not scored on a handful of labels.
+
+    fit_transform() (what the pipeline calls on the training rows) encodes each
+    row with the rates of the other `cv` - 1 folds, so a row's own label never
+    feeds its feature; transform() uses the rates of all training rows.
+    """
+
+    def __init__(self, smoothing: float = 20.0, cv: int = 5, random_state: int = 42):
+        self.smoothing = smoothing
+        self.cv = cv
+        self.random_state = random_state
+
+    def fit_transform(self, X, y=None) -> np.ndarray:
+        self.fit(X, y)
+        columns = _columns(X)
+        y = np.asarray(y)
+        encoded = np.empty((len(y), len(columns)))
+        folds = StratifiedKFold(self.cv, shuffle=True, random_state=self.random_state)
+        for train, held_out in folds.split(np.zeros((len(y), 1)), y):
+            tables, default = self._tables(
+                [values[train] for values in columns], y[train]
+            )
+            encoded[held_out] = self._encode(
+                [values[held_out] for values in columns], tables, default
+            )
+        return encoded
+
+    def _tables(self, columns, y):
+        if y is None:
+            raise ValueError("TargetEncoder needs the labels")
+        y = np.asarray(y, dtype=np.float64)
+        prior = float(y.mean())
+        tables = []
+        for values in columns:
+            stats = pd.Series(y).groupby(values).agg(["sum", "count"])
+            rate = (stats["sum"] + self.smoothing * prior) / (
+                stats["count"] + self.smoothing
+            )
+            tables.append(rate.to_dict())
+        return tables, prior
+
+
+class HashingEncoder(TransformerMixin, BaseEstimator):
+    """
+    One indicator per hash bucket of the category's name (CRC-32, stable across
+    processes). Needs no fitted state beyond a cache of the buckets of the
+    categories seen in fit(); unseen categories are hashed on the fly.
+    """
+
+    def __init__(self, n_buckets: int = 32):
+        self.n_buckets = n_buckets
+
+    def _bucket(self, value) -> int:
+        return zlib.crc32(str(value).encode()) % self.n_buckets
+
+    def fit(self, X, y=None):
+        columns = _columns(X)
+        self.n_features_in_ = len(columns)
+        self.tables_ = [
+            {value: self._bucket(value) for value in pd.unique(values)}
+            for values in columns
+        ]
+        return self
+
+    def transform(self, X) -> np.ndarray:
+        columns = _columns(X)
+        rows = len(columns[0]) if columns else 0
+        encoded = np.zeros((rows, len(columns) * self.n_buckets))
+        for i, (values, table) in enumerate(zip(columns, self.tables_)):
+            buckets = np.fromiter(
+                (
+                    table[value] if value in table else self._bucket(value)
+                    for value in values
+                ),
+                np.int64,
+                rows,
+            )
+            encoded[np.arange(rows), i * self.n_buckets + buckets] = 1.0
+        return encoded
+
+    def get_feature_names_out(self, input_features=None) -> np.ndarray:
+        if input_features is None:
+            input_features = [f"x{i}" for i in range(self.n_features_in_)]
+        return np.asarray(
+            [f"{name}_{b}" for name in input_features for b in range(self.n_buckets)],
+            dtype=object,
+        )
+
+
+ENCODERS = {
+    "frequency": FrequencyEncoder,
+    "target": TargetEncoder,
+    "hashed": HashingEncoder,
+}
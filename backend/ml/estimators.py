@@ -0,0 +1,57 @@
+from dataclasses import dataclass
+from typing import Any, Callable, Dict
+
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+
+# Classifiers build_pipeline (ml/train_model.py) can train, by name. Select one
+# with TRAINING_ESTIMATOR, `python -m ml.train_model --estimator` or
+# POST /train-model?estimator=...; the training report shows the trade-off.
+
+
+class UnknownEstimatorError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class EstimatorSpec:
+    build: Callable[[], Any]
+    description: str
+    # Dense one-hot output, for estimators that do not accept sparse input
+    dense: bool = False
+
+
+ESTIMATORS: Dict[str, EstimatorSpec] = {
+    "random_forest": EstimatorSpec(
+        lambda: RandomForestClassifier(n_estimators=100, random_state=42),
+        "100 fully grown trees",
+    ),
+    "shallow_forest": EstimatorSpec(
+        lambda: RandomForestClassifier(
+            n_estimators=100, max_depth=12, min_samples_leaf=5, random_state=42
+        ),
+        "100 trees of depth 12 at most; smaller and faster to score",
+    ),
+    "hist_gradient_boosting": EstimatorSpec(
+        lambda: HistGradientBoostingClassifier(
+            max_iter=200, early_stopping=True, random_state=42
+        ),
+        "Gradient-boosted trees on binned features",
+        dense=True,
+    ),
+    "logistic_regression": EstimatorSpec(
+        lambda: LogisticRegression(max_iter=1000),
+        "Linear model; smallest and fastest, least accurate on interactions",
+    ),
+}
+
+DEFAULT_ESTIMATOR = "random_forest"
+
+
+def get_estimator(name: str) -> EstimatorSpec:
+    try:
+        return ESTIMATORS[name]
+    except KeyError:
+        raise UnknownEstimatorError(
+            f"Unknown estimator '{name}'; choose one of {', '.join(ESTIMATORS)}."
+        )
@@ -0,0 +1,227 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from config import current_config
+
+# -----------------------------------------------
+# Feature schema shared by training and serving
+# -----------------------------------------------
+# Raw transaction columns the features are derived from
+SOURCE_COLUMNS = [
+    "trans_date_trans_time",
+    "merchant",
+    "category",
+    "amt",
+    "gender",
+    "lat",
+    "long",
+    "city_pop",
+    "merch_lat",
+    "merch_long",
+]
+
+DERIVED_FEATURES = ["distance", "hour", "day_of_week", "month"]
+
+NUM_FEATURES = [
+    "amt",
+    "lat",
+    "long",
+    "city_pop",
+    "merch_lat",
+    "merch_long",
+    "distance",
+    "hour",
+    "day_of_week",
+    "month",
+]
+CAT_FEATURES = ["category", "gender", "merchant"]
+# Hundreds of levels; see TRAINING_CAT_ENCODING
+HIGH_CARDINALITY_FEATURES = ["merchant"]
+FEATURE_COLUMNS = NUM_FEATURES + CAT_FEATURES
+
+NS_PER_SECOND = 1_000_000_000
+NS_PER_MINUTE = 60 * NS_PER_SECOND
+NS_PER_HOUR = 60 * NS_PER_MINUTE
+NS_PER_DAY = 24 * NS_PER_HOUR
+
+
+# -----------------------------------------------
+# Compiled timestamp format
+# -----------------------------------------------
+class FixedWidthTimeFormat:
+    """
+    A strptime format made only of zero-padded numeric fields (%Y %m %d %H %M %S)
+    and literal characters, compiled to byte offsets. Parsing slices digits out
+    of a fixed-width byte matrix instead of running strptime per row.
+    """
+
+    WIDTHS = {"Y": 4, "m": 2, "d": 2, "H": 2, "M": 2, "S": 2}
+
+    def __init__(self, fields: Dict[str, Tuple[int, int]], literals, length: int):
+        self.fields = fields
+        self.literals: List[Tuple[int, int]] = literals
+        self.length = length
+
+    @classmethod
+    def compile(cls, time_format: str) -> Optional["FixedWidthTimeFormat"]:
+        fields, literals, offset, i = {}, [], 0, 0
+        while i < len(time_format):
+            char = time_format[i]
+            if char == "%":
+                directive = time_format[i + 1 : i + 2]
+                if directive not in cls.WIDTHS or directive in fields:
+                    return None
+                fields[directive] = (offset, cls.WIDTHS[directive])
+                offset += cls.WIDTHS[directive]
+                i += 2
+            else:
+                if not char.isascii():
+                    return None
+                literals.append((offset, ord(char)))
+                offset += 1
+                i += 1
+        if not {"Y", "m", "d"} <= set(fields):
+            return None
+        return cls(fields, literals, offset)
+
+    def parse(self, values: np.ndarray) -> Optional[np.ndarray]:
+        """datetime64[ns] array, or None if any value does not have the layout."""
+        width = self.length
+        try:
+            raw = np.asarray(values, dtype=f"S{width + 1}")
+        except (UnicodeEncodeError, ValueError, TypeError):
+            return None
+        buf = raw.view(np.uint8).reshape(-1, width + 1)
+        if buf[:, width].any() or not buf[:, width - 1].all():
+            return None
+        for offset, code in self.literals:
+            if (buf[:, offset] != code).any():
+                return None
+
+        parts = {}
+        for name, (offset, size) in self.fields.items():
+            digits = buf[:, offset : offset + size] - np.uint8(48)
+            if (digits > 9).any():
+                return None
+            value = np.zeros(len(buf), dtype="int64")
+            for k in range(size):
+                value = value * 10 + digits[:, k]
+            parts[name] = value
+
+        zero = np.zeros(len(buf), dtype="int64")
+        hour, minute, second = (parts.get(f, zero) for f in ("H", "M", "S"))
+        months = (parts["Y"] - 1970) * 12 + parts["m"] - 1
+        month_start = months.astype("datetime64[M]").astype("datetime64[D]")
+        days_in_month = (
+            (months + 1).astype("datetime64[M]").astype("datetime64[D]") - month_start
+        ).astype("int64")
+        if (
+            ((parts["m"] < 1) | (parts["m"] > 12)).any()
+            or ((parts["d"] < 1) | (parts["d"] > days_in_month)).any()
+            or (hour > 23).any()
+            or (minute > 59).any()
+            or (second > 59).any()
+        ):
+            raise ValueError("trans_date_trans_time contains out-of-range dates")
+
+        ns = (month_start.astype("datetime64[ns]").view("int64")) + (
+            (parts["d"] - 1) * NS_PER_DAY
+            + hour * NS_PER_HOUR
+            + minute * NS_PER_MINUTE
+            + second * NS_PER_SECOND
+        )
+        return ns.view("datetime64[ns]")
+
+
+def parse_dates(values: pd.Series, date_format: str) -> pd.Series:
+    """
+    Parse with `date_format`; files in another layout (e.g. with seconds or ISO
+    timestamps) fall back to pandas' inference, day first, as before formats
+    were configurable.
+    """
+    try:
+        return pd.to_datetime(values, format=date_format)
+    except (TypeError, ValueError):
+        return pd.to_datetime(values, dayfirst=True)
+
+
+class FeatureTransformer:
+    """
+    Builds the model input from raw transaction columns. Timestamps are parsed
+    once with an explicit format and all derived features are computed on the
+    underlying NumPy arrays.
+    """
+
+    def __init__(self, time_format: str):
+        self.time_format = time_format
+        self.compiled_format = FixedWidthTimeFormat.compile(time_format)
+
+    def parse_timestamps(self, values: pd.Series) -> np.ndarray:
+        # Already typed columns are used as-is; text is parsed exactly once
+        if pd.api.types.is_datetime64_any_dtype(values):
+            return values.to_numpy(dtype="datetime64[ns]")
+        if self.compiled_format is not None:
+            try:
+                parsed = self.compiled_format.parse(values.to_numpy())
+            except ValueError:
+                # Out-of-range fields, e.g. month-first dates; see parse_dates
+                parsed = None
+            if parsed is not None:
+                return parsed
+        # Formats with names/unpadded fields go through pandas, still explicit
+        return parse_dates(values, self.time_format).to_numpy(dtype="datetime64[ns]")
+
+    def derived(self, df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        timestamps = self.parse_timestamps(df["trans_date_trans_time"])
+        ns = timestamps.view("int64")
+        days = ns // NS_PER_DAY
+
+        # sqrt((merch_lat - lat)^2 + (merch_long - long)^2), reusing one buffer
+        distance = np.subtract(
+            df["merch_lat"].to_numpy(dtype="float64"),
+            df["lat"].to_numpy(dtype="float64"),
+        )
+        np.square(distance, out=distance)
+        dlong = np.subtract(
+            df["merch_long"].to_numpy(dtype="float64"),
+            df["long"].to_numpy(dtype="float64"),
+        )
+        np.square(dlong, out=dlong)
+        distance += dlong
+        np.sqrt(distance, out=distance)
+
+        return {
+            "distance": distance,
+            "hour": (ns // NS_PER_HOUR % 24).astype("int64"),
+            # 1970-01-01 was a Thursday; Monday=0 as in pandas' dayofweek
+            "day_of_week": ((days + 3) % 7).astype("int64"),
+            "month": (timestamps.astype("datetime64[M]").view("int64") % 12 + 1).astype(
+                "int64"
+            ),
+        }
+
+    def add_derived(self, df: pd.DataFrame) -> pd.DataFrame:
+        # Adds distance/hour/day_of_week/month to `df` in place
+        for name, values in self.derived(df).items():
+            df[name] = values
+        return df
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Return exactly FEATURE_COLUMNS, without copying the other columns."""
+        # Rows read back from the database carry the derived features already
+        if all(name in df for name in DERIVED_FEATURES):
+            columns = {}
+        else:
+            columns = self.derived(df)
+        for name in FEATURE_COLUMNS:
+            if name not in columns:
+                columns[name] = df[name].to_numpy()
+        return pd.DataFrame(
+            {name: columns[name] for name in FEATURE_COLUMNS},
+            index=df.index,
+            copy=False,
+        )
+
+
+feature_transformer = FeatureTransformer(current_config.TRANSACTION_TIME_FORMAT)
@@ -0,0 +1,278 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Trained pipelines of ColumnTransformer(StandardScaler, OneHotEncoder) and a
+# RandomForestClassifier, compiled into flat node arrays and evaluated with
+# NumPy alone. The result equals the pipeline's predict_proba bit for bit:
+# inputs are scaled in float64 and compared as float32 like sklearn's trees do,
+# one-hot splits become category comparisons on the source column, and tree
+# probabilities are summed in estimator order. Only NumPy and pandas are needed
+# to load and run a compiled engine.
+
+# Tree levels descended between removals of finished rows
+LEVELS_PER_PASS = 4
+# Rows evaluated together; the working arrays hold one entry per tree and row
+CHUNK_ROWS = 1024
+
+
+class UnsupportedModelError(ValueError):
+    pass
+
+
+def compiled_path(model_path: str) -> str:
+    # Written by ml/train_model.py next to the pipeline it was compiled from
+    return f"{model_path}.compiled"
+
+
+class ForestEngine:
+    """
+    Random forest over one value matrix per batch: the scaled numeric features,
+    one category code per one-hot encoded feature, then the looked-up value of
+    each frequency or target encoded feature. The nodes of all trees are
+    concatenated; a row goes to the right child of a node when its value lies in
+    (lower, upper]. Leaves point to themselves.
+    """
+
+    def __init__(
+        self,
+        source_version: str,
+        num_features: List[str],
+        mean: np.ndarray,
+        scale: np.ndarray,
+        cat_features: List[str],
+        categories: List[Dict[object, int]],
+        mapped_features: List[str],
+        mappings: List[Tuple[Dict[object, float], float]],
+        classes: np.ndarray,
+        nodes: Dict[str, np.ndarray],
+        roots: np.ndarray,
+    ):
+        # Digest of the artifact this engine was compiled from
+        self.source_version = source_version
+        self.num_features = num_features
+        self.mean = mean
+        self.scale = scale
+        self.cat_features = cat_features
+        # Category -> code, the category's position in the one-hot encoding
+        self.categories = categories
+        self.mapped_features = mapped_features
+        # (category -> encoded value, value of unseen categories)
+        self.mappings = mappings
+        self.classes_ = classes
+        self.feature = nodes["feature"]
+        self.lower = nodes["lower"]
+        self.upper = nodes["upper"]
+        # (left, right) child of each node
+        self.children = nodes["children"]
+        self.is_leaf = nodes["is_leaf"]
+        # Class probabilities of each node, as the tree would return them
+        self.value = nodes["value"]
+        self.roots = roots
+
+    def _values(self, X: pd.DataFrame) -> np.ndarray:
+        n_num, n_cat = len(self.num_features), len(self.cat_features)
+        values = np.empty(
+            (len(X), n_num + n_cat + len(self.mapped_features)), np.float32
+        )
+        numeric = np.column_stack(
+            [X[name].to_numpy(dtype=np.float64) for name in self.num_features]
+        )
+        values[:, :n_num] = (numeric - self.mean) / self.scale
+        for i, (name, codes) in enumerate(zip(self.cat_features, self.categories)):
+            # -1 for unseen categories, which one-hot encode to all zeros
+            values[:, n_num + i] = np.fromiter(
+                (codes.get(value, -1) for value in X[name].to_numpy()),
+                np.float32,
+                len(X),
+            )
+        for i, (name, (table, default)) in enumerate(
+            zip(self.mapped_features, self.mappings)
+        ):
+            # Looked up in float64 and rounded once, as the pipeline does
+            values[:, n_num + n_cat + i] = np.fromiter(
+                (table.get(value, default) for value in X[name].to_numpy()),
+                np.float64,
+                len(X),
+            )
+        return values
+
+    def _leaves(self, values: np.ndarray) -> np.ndarray:
+        # Leaf reached in every tree by each row of `values`, shape (trees, rows)
+        rows, width = values.shape
+        trees = len(self.roots)
+        flat = values.ravel()
+        leaves = np.empty(trees * rows, np.intp)
+        # One (tree, row) pair per entry, grouped by tree; finished pairs are
+        # moved out every few levels, as a leaf just stays where it is
+        node = np.repeat(self.roots, rows)
+        offset = np.tile(np.arange(rows) * width, trees)
+        position = np.arange(trees * rows)
+        while node.size:
+            for _ in range(LEVELS_PER_PASS):
+                value = flat[offset + self.feature[node]]
+                right = (value > self.lower[node]) & (value <= self.upper[node])
+                node = self.children[right.view(np.int8), node]
+            done = self.is_leaf[node]
+            leaves[position[done]] = node[done]
+            active = ~done
+            node, offset, position = node[active], offset[active], position[active]
+        return leaves.reshape(trees, rows)
+
+    def predict_proba(self, X: pd.DataFrame) -> np.ndarray:
+        values = self._values(X)
+        proba = np.empty((len(values), self.value.shape[1]))
+        for start in range(0, len(values), CHUNK_ROWS):
+            leaves = self._leaves(values[start : start + CHUNK_ROWS])
+            # (trees, rows, classes) summed over the first axis adds tree by tree
+            chunk = self.value[leaves].sum(axis=0)
+            chunk /= len(self.roots)
+            proba[start : start + CHUNK_ROWS] = chunk
+        return proba
+
+    def predict(self, X: pd.DataFrame) -> np.ndarray:
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+# -----------------------------------------------
+# Compilation
+# -----------------------------------------------
+def _split_pipeline(pipeline) -> Tuple[object, object]:
+    # Preprocessor, then samplers (skipped at predict time), then the forest
+    steps = [step for _, step in pipeline.steps]
+    middle = steps[1:-1]
+    if len(steps) < 2 or not all(hasattr(step, "fit_resample") for step in middle):
+        raise UnsupportedModelError("Expected preprocessing, samplers, classifier")
+    return steps[0], steps[-1]
+
+
+def _input_columns(preprocessor) -> tuple:
+    """
+    ForestEngine's input arguments (columns, scaler parameters, category codes
+    and lookup tables), and for each column the preprocessor outputs its value
+    column and category code (-1 unless one-hot).
+    """
+    num_features, means, scales, cat_features, categories = [], [], [], [], []
+    mapped_features, mappings, outputs = [], [], []
+    for name, transformer, columns in preprocessor.transformers_:
+        if transformer == "drop" or not len(columns):
+            continue
+        kind = type(transformer).__name__
+        if kind == "StandardScaler":
+            count = len(columns)
+            means.append(
+                transformer.mean_ if transformer.with_mean else np.zeros(count)
+            )
+            scales.append(
+                transformer.scale_ if transformer.with_std else np.ones(count)
+            )
+            outputs.append(("num", list(columns)))
+            num_features += list(columns)
+        elif kind == "OneHotEncoder":
+            if (
+                transformer.drop is not None
+                or transformer.handle_unknown != "ignore"
+                or transformer.min_frequency is not None
+                or transformer.max_categories is not None
+            ):
+                raise UnsupportedModelError(f"Unsupported one-hot encoding in {name}")
+            outputs.append(("cat", list(columns)))
+            cat_features += list(columns)
+            categories += [
+                {category: code for code, category in enumerate(values)}
+                for values in transformer.categories_
+            ]
+        elif kind in ("FrequencyEncoder", "TargetEncoder"):
+            outputs.append(("mapped", list(columns)))
+            mapped_features += list(columns)
+            mappings += [(table, transformer.default_) for table in transformer.tables_]
+        else:
+            raise UnsupportedModelError(f"Unsupported transformer {kind} in {name}")
+
+    # Columns of the transformed matrix, in the preprocessor's output order
+    value_columns, category_codes = [], []
+    for kind, columns in outputs:
+        for column in columns:
+            if kind == "num":
+                value_columns.append(num_features.index(column))
+                category_codes.append(-1)
+            elif kind == "mapped":
+                position = len(num_features) + len(cat_features)
+                value_columns.append(position + mapped_features.index(column))
+                category_codes.append(-1)
+            else:
+                position = cat_features.index(column)
+                count = len(categories[position])
+                value_columns += [len(num_features) + position] * count
+                category_codes += list(range(count))
+    inputs = {
+        "num_features": num_features,
+        "mean": np.concatenate(means) if means else np.zeros(0),
+        "scale": np.concatenate(scales) if scales else np.ones(0),
+        "cat_features": cat_features,
+        "categories": categories,
+        "mapped_features": mapped_features,
+        "mappings": mappings,
+    }
+    return inputs, (
+        np.array(value_columns, dtype=np.int32),
+        np.array(category_codes, dtype=np.int32),
+    )
+
+
+def compile_pipeline(pipeline, source_version: str) -> ForestEngine:
+    """ForestEngine for a fitted pipeline; UnsupportedModelError for other models."""
+    preprocessor, forest = _split_pipeline(pipeline)
+    if type(preprocessor).__name__ != "ColumnTransformer":
+        raise UnsupportedModelError("Expected a ColumnTransformer")
+    if type(forest).__name__ != "RandomForestClassifier" or forest.n_outputs_ != 1:
+        raise UnsupportedModelError("Expected a single-output RandomForestClassifier")
+    inputs, (value_columns, category_codes) = _input_columns(preprocessor)
+
+    parts = {key: [] for key in ("feature", "lower", "upper", "left", "right")}
+    leaves, values, roots, offset = [], [], [], 0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        leaf = tree.children_left < 0
+        split = np.where(leaf, 0, tree.feature)
+        category = category_codes[split]
+        is_category = (category >= 0) & ~leaf
+        nodes = np.arange(tree.node_count) + offset
+        parts["feature"].append(value_columns[split])
+        # Numeric: value > threshold. One-hot column: value == category code.
+        # A leaf's range is empty, so it goes "left" to itself.
+        parts["lower"].append(
+            np.where(
+                leaf, np.inf, np.where(is_category, category - 0.5, tree.threshold)
+            )
+        )
+        parts["upper"].append(np.where(is_category, category + 0.5, np.inf))
+        parts["left"].append(np.where(leaf, nodes, tree.children_left + offset))
+        parts["right"].append(np.where(leaf, nodes, tree.children_right + offset))
+        leaves.append(leaf)
+        # Normalized like DecisionTreeClassifier.predict_proba
+        proba = tree.value[:, 0, : forest.n_classes_]
+        normalizer = proba.sum(axis=1)[:, np.newaxis]
+        normalizer[normalizer == 0.0] = 1.0
+        values.append(proba / normalizer)
+        roots.append(offset)
+        offset += tree.node_count
+
+    nodes = {
+        "feature": np.concatenate(parts["feature"]).astype(np.intp),
+        "lower": np.concatenate(parts["lower"]).astype(np.float64),
+        "upper": np.concatenate(parts["upper"]).astype(np.float64),
+        "children": np.stack(
+            [np.concatenate(parts["left"]), np.concatenate(parts["right"])]
+        ).astype(np.intp),
+        "is_leaf": np.concatenate(leaves),
+        "value": np.concatenate(values),
+    }
+    return ForestEngine(
+        source_version,
+        classes=forest.classes_,
+        nodes=nodes,
+        roots=np.array(roots, dtype=np.intp),
+        **inputs,
+    )
@@ -0,0 +1,209 @@
+import asyncio
+import multiprocessing
+import os
+import socket
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import List, Optional
+
+from config import current_config
+from database import db
+from fastapi.concurrency import run_in_threadpool
+from logger import logger
+from ml.estimators import get_estimator
+from ml.registry import model_registry
+from ml.train_model import run_training_job
+from models.training_job import TrainingJob
+from tortoise.exceptions import IntegrityError
+from utils.metrics import TRAINING_JOBS, TRAINING_ROWS, TRAINING_SECONDS
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+# Seconds between writes of a running job's progress to the database
+PROGRESS_INTERVAL = 1.0
+
+
+class JobConflictError(RuntimeError):
+    pass
+
+
+def _report(progress, job_id: str, stage: str, fraction: float):
+    # Runs in the worker process; `progress` is a Manager dict proxy
+    progress[job_id] = (stage, fraction, time.time())
+
+
+def _this_worker() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _abandoned(job: TrainingJob) -> bool:
+    # Active, but its API worker on this host has exited (e.g. was restarted)
+    host, _, pid = job.worker.rpartition(":")
+    if host != socket.gethostname():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass
+    return False
+
+
+# -----------------------------------------------
+# Job Manager
+# -----------------------------------------------
+class JobManager:
+    """
+    Runs training in a separate process so the API event loop and the served
+    model are never blocked by fitting. Every job writes MODEL_PATH, so only
+    one is queued or running at a time; the finished model is activated
+    through the registry.
+
+    Jobs are stored in the training_jobs table, so every API worker sees the
+    same jobs and the one-job limit holds across workers. The worker that
+    submitted a job runs it and records its progress.
+    """
+
+    def __init__(self, history: int):
+        self.history = history
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+        self._progress = None
+
+    def _ensure_pool(self):
+        if self._pool is None:
+            # spawn: workers must not inherit the event loop or DB connections
+            context = multiprocessing.get_context("spawn")
+            self._manager = context.Manager()
+            self._progress = self._manager.dict()
+            self._pool = ProcessPoolExecutor(max_workers=1, mp_context=context)
+
+    async def submit(self, estimator: Optional[str] = None) -> TrainingJob:
+        # Raises UnknownEstimatorError before anything is queued
+        estimator = estimator or current_config.TRAINING_ESTIMATOR
+        get_estimator(estimator)
+        job = await self._claim(estimator)
+
+        try:
+            self._ensure_pool()
+            future = self._pool.submit(
+                run_training_job,
+                db.tortoise_config(),
+                partial(_report, self._progress, job.id),
+                estimator,
+            )
+        except Exception as e:
+            # Release the claim, or every later submit would get a conflict
+            job.status, job.error, job.active = FAILED, str(e), None
+            job.finished_at = time.time()
+            await job.save()
+            TRAINING_JOBS.labels(FAILED).inc()
+            logger.error(f"Training job {job.id} could not be started: {e}")
+            raise
+        asyncio.ensure_future(self._watch(job, asyncio.wrap_future(future)))
+        logger.info(f"Training job {job.id} queued ({estimator}).")
+        return job
+
+    async def _claim(self, estimator: str) -> TrainingJob:
+        # The unique index on `active` admits one queued or running job
+        for _ in range(2):
+            try:
+                return await TrainingJob.create(
+                    id=uuid.uuid4().hex,
+                    estimator=estimator,
+                    status=QUEUED,
+                    active=True,
+                    worker=_this_worker(),
+                    created_at=time.time(),
+                )
+            except IntegrityError:
+                current = await TrainingJob.get_or_none(active=True)
+                if current is not None and not _abandoned(current):
+                    raise JobConflictError(
+                        f"Training job {current.id} is already {current.status}."
+                    )
+                if current is not None:
+                    current.status, current.active = FAILED, None
+                    current.error = "The worker running the job exited."
+                    current.finished_at = time.time()
+                    await current.save()
+                    logger.warning(f"Training job {current.id} was abandoned.")
+        raise JobConflictError("Another training job is being submitted.")
+
+    async def _watch(self, job: TrainingJob, future: asyncio.Future):
+        try:
+            while not future.done():
+                await asyncio.wait({future}, timeout=PROGRESS_INTERVAL)
+                await self._sync(job)
+            result = future.result()
+            if result is None:
+                raise RuntimeError("No data found in 'transactions' table.")
+            job.stage = "activating"
+            await job.save(update_fields=["stage"])
+            # Swap the served model; in-flight requests finish on the previous
+            # one. Other workers pick the new artifact up on their next check.
+            loaded = await run_in_threadpool(model_registry.activate)
+            job.model_version = loaded.version
+            job.report = result.report
+            job.status, job.stage, job.progress = SUCCEEDED, "done", 1.0
+            TRAINING_JOBS.labels(SUCCEEDED).inc()
+            TRAINING_SECONDS.observe(result.seconds)
+            TRAINING_ROWS.set(result.rows)
+            logger.info(f"Training job {job.id} finished, model {job.model_version}.")
+        except Exception as e:
+            job.status, job.error = FAILED, str(e)
+            TRAINING_JOBS.labels(FAILED).inc()
+            logger.error(f"Training job {job.id} failed: {e}")
+        finally:
+            job.finished_at, job.active = time.time(), None
+            if self._progress is not None:
+                self._progress.pop(job.id, None)
+            try:
+                await job.save()
+                await self._prune()
+            except Exception as e:
+                logger.error(f"Could not record training job {job.id}: {e}")
+
+    async def _sync(self, job: TrainingJob):
+        # Progress reported by the training process, written for other workers
+        report = self._progress.get(job.id) if self._progress is not None else None
+        if report is None:
+            return
+        stage, fraction, reported_at = report
+        if job.status == QUEUED:
+            job.status, job.started_at = RUNNING, reported_at
+        elif (job.stage, job.progress) == (stage, fraction):
+            return
+        job.stage, job.progress = stage, fraction
+        await job.save(update_fields=["status", "started_at", "stage", "progress"])
+
+    async def _prune(self):
+        finished = (
+            TrainingJob.filter(active__isnull=True)
+            .order_by("-created_at")
+            .offset(self.history)
+        )
+        stale = await finished.values_list("id", flat=True)
+        if stale:
+            await TrainingJob.filter(id__in=stale).delete()
+
+    async def get(self, job_id: str) -> Optional[TrainingJob]:
+        return await TrainingJob.get_or_none(id=job_id)
+
+    async def list(self) -> List[TrainingJob]:
+        return await TrainingJob.all().order_by("created_at")
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._manager.shutdown()
+            self._pool = self._manager = self._progress = None
+
+
+training_jobs = JobManager(current_config.TRAINING_JOB_HISTORY)
@@ -0,0 +1,158 @@
+import hashlib
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Tuple
+
+import joblib
+from config import current_config
+from logger import logger
+from ml.forest_engine import compiled_path
+from utils.metrics import ML_STAGE_SECONDS
+
+
+# -----------------------------------------------
+# Loaded model snapshot
+# -----------------------------------------------
+@dataclass(frozen=True)
+class LoadedModel:
+    version: str
+    model: Any
+    path: str
+    mtime_ns: int
+    size: int
+    loaded_at: float
+    # Compiled forest of the same version (MODEL_ENGINE=compiled)
+    engine: Any = None
+
+    def scorer(self, rows: int) -> Any:
+        # The compiled engine is only faster for small batches
+        if self.engine is not None and rows <= current_config.MODEL_ENGINE_MAX_ROWS:
+            return self.engine
+        return self.model
+
+    def info(self) -> dict:
+        return {
+            "version": self.version,
+            "path": self.path,
+            "size": self.size,
+            "engine": "compiled" if self.engine is not None else "sklearn",
+            "loaded_at": self.loaded_at,
+        }
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+# -----------------------------------------------
+# Process-wide registry
+# -----------------------------------------------
+class ModelRegistry:
+    """
+    Loads the model artifact once per process and hands out immutable
+    LoadedModel snapshots. A new artifact (different mtime/size and content hash)
+    replaces the snapshot with a single reference swap, so callers holding the
+    previous snapshot keep scoring with it until they finish.
+    """
+
+    def __init__(self, path: str, check_interval: float):
+        self.path = path
+        self.check_interval = check_interval
+        self._current: Optional[LoadedModel] = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[LoadedModel], None]] = []
+
+    @property
+    def current(self) -> Optional[LoadedModel]:
+        return self._current
+
+    def add_listener(self, callback: Callable[[LoadedModel], None]):
+        # Called with the new snapshot whenever the served version changes
+        self._listeners.append(callback)
+
+    def get(self) -> LoadedModel:
+        current = self._current
+        if (
+            current is not None
+            and time.monotonic() - self._last_check < self.check_interval
+        ):
+            return current
+        return self.reload()
+
+    def reload(self, force: bool = False) -> LoadedModel:
+        previous = self._current
+        loaded = self._reload(force)
+        if previous is None or previous.version != loaded.version:
+            for callback in self._listeners:
+                callback(loaded)
+        return loaded
+
+    def _reload(self, force: bool) -> LoadedModel:
+        with self._lock:
+            self._last_check = time.monotonic()
+            stat = os.stat(self.path)
+            current = self._current
+
+            if (
+                not force
+                and current is not None
+                and (current.mtime_ns, current.size) == (stat.st_mtime_ns, stat.st_size)
+            ):
+                return current
+
+            version = file_digest(self.path)
+            if current is not None and current.version == version:
+                # Touched but unchanged; keep the loaded model
+                model, engine = current.model, current.engine
+            else:
+                started = time.perf_counter()
+                model, engine = self._load(version)
+                seconds = time.perf_counter() - started
+                ML_STAGE_SECONDS.labels("model_load").observe(seconds)
+                logger.info(
+                    f"Loaded model {version} from {self.path} in {seconds:.2f}s"
+                )
+
+            self._current = LoadedModel(
+                version=version,
+                model=model,
+                path=self.path,
+                mtime_ns=stat.st_mtime_ns,
+                size=stat.st_size,
+                loaded_at=time.time(),
+                engine=engine,
+            )
+            return self._current
+
+    def _load(self, version: str) -> Tuple[Any, Any]:
+        # (pipeline, compiled engine or None)
+        mmap_mode = current_config.MODEL_MMAP_MODE or None
+        model = joblib.load(self.path, mmap_mode=mmap_mode)
+        if current_config.MODEL_ENGINE != "compiled":
+            return model, None
+        try:
+            engine = joblib.load(compiled_path(self.path), mmap_mode=mmap_mode)
+        except FileNotFoundError:
+            engine = None
+        if engine is None or engine.source_version != version:
+            logger.warning(
+                f"No compiled engine for model {version}; serving the pipeline"
+            )
+            return model, None
+        return model, engine
+
+    def activate(self) -> LoadedModel:
+        # Called after a new artifact has been written in place
+        return self.reload(force=True)
+
+
+model_registry = ModelRegistry(
+    current_config.MODEL_PATH, current_config.MODEL_CHECK_INTERVAL
+)
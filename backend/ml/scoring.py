@@ -0,0 +1,156 @@
+import asyncio
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from database.bulk import bulk_update_scores
+from database.columnar import fetch_columns
+from database.data_version import bump_data_version
+from database.dictionary import decode_columns, stored_columns
+from database.locks import advisory_lock
+from fastapi.concurrency import run_in_threadpool
+from logger import logger
+from ml.features import FEATURE_COLUMNS, feature_transformer
+from ml.registry import LoadedModel, model_registry
+from tortoise.transactions import in_transaction
+from utils.metrics import ML_STAGE_SECONDS
+
+SCORE_COLUMNS = ["fraud_score", "predicted_fraud", "score_version"]
+
+RESCORE_BATCH_ROWS = 5000
+
+# Advisory lock held by the one process re-scoring at a time, and how long the
+# others wait before trying again
+RESCORE_LOCK_KEY = 0x7265_7363_6F72_65
+RESCORE_RETRY_SECONDS = 5.0
+
+
+# -----------------------------------------------
+# Features & Scoring
+# -----------------------------------------------
+def score_frame(loaded: LoadedModel, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """Return (fraud probability, predicted label) for each row of `df`."""
+    model = loaded.scorer(len(df))
+    with ML_STAGE_SECONDS.labels("features").time():
+        X = feature_transformer.transform(df)
+    with ML_STAGE_SECONDS.labels("inference").time():
+        proba = model.predict_proba(X)
+    fraud_col = list(model.classes_).index(1)
+    predicted = model.classes_[proba.argmax(axis=1)].astype(bool)
+    return proba[:, fraud_col], predicted
+
+
+def attach_scores(loaded: LoadedModel, df: pd.DataFrame) -> pd.DataFrame:
+    # Score-on-ingest: the predictions are written together with the rows
+    score, predicted = score_frame(loaded, df)
+    df["fraud_score"] = score
+    df["predicted_fraud"] = predicted
+    df["score_version"] = loaded.version
+    return df
+
+
+def current_model() -> Optional[LoadedModel]:
+    try:
+        return model_registry.get()
+    except FileNotFoundError:
+        return None
+
+
+# -----------------------------------------------
+# Background Re-scoring
+# -----------------------------------------------
+class Rescorer:
+    """
+    Re-scores rows whose stored predictions come from another model version, in
+    id order and in fixed-size batches, as a single background task per process.
+    Every API worker schedules it, but only the one holding RESCORE_LOCK_KEY
+    runs; the others retry until it is free, as the rows may be stale for the
+    model they serve.
+    """
+
+    def __init__(self, batch_rows: int = RESCORE_BATCH_ROWS):
+        self.batch_rows = batch_rows
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pending = False
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        model_registry.add_listener(lambda loaded: self.schedule())
+        self.schedule()
+
+    def schedule(self):
+        # Safe to call from any thread, e.g. the registry's reload in a worker
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._ensure_task)
+
+    def _ensure_task(self):
+        if self._task is not None and not self._task.done():
+            self._pending = True
+            return
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self):
+        while True:
+            self._pending = False
+            try:
+                async with advisory_lock(RESCORE_LOCK_KEY) as owned:
+                    if owned:
+                        rescored = await self.rescore_stale()
+                        if rescored:
+                            logger.info(f"Re-scored {rescored} transactions.")
+                if not owned:
+                    # Another process is re-scoring
+                    await asyncio.sleep(RESCORE_RETRY_SECONDS)
+                    self._pending = True
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Re-scoring failed: {e}")
+            if not self._pending:
+                return
+
+    async def rescore_stale(self) -> int:
+        rescored = 0
+        last_id = 0
+        version = None
+        while True:
+            loaded = await run_in_threadpool(current_model)
+            if loaded is None:
+                return rescored
+            if loaded.version != version:
+                # A newer model was activated mid-run; start over with it
+                version, last_id = loaded.version, 0
+
+            rows = await fetch_columns(
+                ["id"] + stored_columns(FEATURE_COLUMNS),
+                '"id" > {} AND ("score_version" IS NULL OR "score_version" <> {})',
+                (last_id, version),
+                limit=self.batch_rows,
+            )
+            if not len(rows["id"]):
+                return rescored
+
+            batch = await decode_columns(pd.DataFrame(rows, copy=False))
+            score, predicted = await run_in_threadpool(score_frame, loaded, batch)
+            # Scores and the version bump commit together, so caches keyed on
+            # the data version never miss an update
+            async with in_transaction() as connection:
+                await bulk_update_scores(
+                    batch["id"].tolist(), score, predicted, version, connection
+                )
+                await bump_data_version(connection, rescored=True)
+
+            last_id = int(batch["id"].iloc[-1])
+            rescored += len(batch)
+
+
+rescorer = Rescorer()
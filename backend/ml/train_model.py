@@ -1,141 +1,390 @@
+import argparse
 import asyncio
+import json
+import os
+import resource
+import sys
+import time
+from typing import Callable, NamedTuple, Optional, Tuple
 
 import joblib
 import numpy as np
 import pandas as pd
+from config import current_config
 from imblearn.over_sampling import SMOTE
 from imblearn.pipeline import Pipeline as imbpipeline
-from models.transaction import Transaction
+from imblearn.under_sampling import RandomUnderSampler
+from logger import logger
+from ml.dataset import StratifiedReservoir, iter_feature_batches
+from ml.encoders import ENCODERS
+from ml.estimators import DEFAULT_ESTIMATOR, get_estimator
+from ml.features import (
+    CAT_FEATURES,
+    FEATURE_COLUMNS,
+    HIGH_CARDINALITY_FEATURES,
+    NUM_FEATURES,
+)
+from ml.forest_engine import (
+    ForestEngine,
+    UnsupportedModelError,
+    compile_pipeline,
+    compiled_path,
+)
+from ml.registry import LoadedModel, file_digest
 from sklearn.compose import ColumnTransformer
-from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import average_precision_score, precision_recall_curve
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from tortoise import Tortoise
 
 
 # -----------------------------------------------
-# 1. Fetch data from PostgreSQL (async)
+# 1. Load features from PostgreSQL (async, batched)
 # -----------------------------------------------
-async def fetch_transactions():
-    records = await Transaction.all().values()
-    df = pd.DataFrame(records)
-    return df
+async def load_training_data(
+    mode: str, batch_rows: int, sample_rows: int
+) -> Tuple[pd.DataFrame, np.ndarray, int]:
+    """
+    Stream the table and return (X, y, rows read). Features are built per batch
+    with the serving code (ml/features.py), so raw rows never pile up.
+    """
+    if mode == "sample":
+        reservoir = StratifiedReservoir(sample_rows)
+        async for X, y in iter_feature_batches(batch_rows):
+            reservoir.add(X, y)
+        X, y = reservoir.sample()
+        return X, y, reservoir.seen
+
+    if mode != "full":
+        raise ValueError(f"Unknown training mode: {mode}")
+    features, labels = [], []
+    async for X, y in iter_feature_batches(batch_rows):
+        features.append(X)
+        labels.append(y)
+    if not features:
+        return pd.DataFrame(columns=FEATURE_COLUMNS), np.empty(0, dtype="int64"), 0
+    X = pd.concat(features, ignore_index=True)
+    del features
+    return X, np.concatenate(labels), len(X)
 
 
 # -----------------------------------------------
-# 2. Preprocess & Feature Engineering
+# 2. Resource usage
 # -----------------------------------------------
-def preprocess_data(df: pd.DataFrame):
-    # Convert to datetime
-    df["trans_date_trans_time"] = pd.to_datetime(
-        df["trans_date_trans_time"], dayfirst=True
-    )
+def peak_rss_mb() -> float:
+    # ru_maxrss is kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
 
-    # Extract date features
-    df["hour"] = df["trans_date_trans_time"].dt.hour
-    df["day_of_week"] = df["trans_date_trans_time"].dt.dayofweek
-    df["month"] = df["trans_date_trans_time"].dt.month
 
-    # Compute distance from merchant location
-    df["distance"] = np.sqrt(
-        (df["merch_lat"] - df["lat"]) ** 2 + (df["merch_long"] - df["long"]) ** 2
-    )
+# -----------------------------------------------
+# 3. Build Model Pipeline
+# -----------------------------------------------
+ENCODINGS = ["onehot", *ENCODERS]
+BALANCING = ["smote", "undersample", "class_weight"]
 
-    # Drop non-useful columns
-    drop_cols = [
-        "trans_date_trans_time",
-        "first",
-        "last",
-        "street",
-        "city",
-        "state",
-        "zip",
-        "job",
-        "dob",
-        "trans_num",
-        "unix_time",
-        "cc_num",
-        "id",
-        "created_at",
-    ]
-    df.drop([col for col in drop_cols if col in df.columns], axis=1, inplace=True)
 
-    return df
+def check_options(estimator: str, encoding: str, balancing: str):
+    get_estimator(estimator)
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown categorical encoding: {encoding}")
+    if balancing not in BALANCING:
+        raise ValueError(f"Unknown class balancing: {balancing}")
 
 
-# -----------------------------------------------
-# 3. Build Model Pipeline
-# -----------------------------------------------
-def build_pipeline(num_features, cat_features):
+def build_pipeline(
+    num_features,
+    cat_features,
+    estimator: str = DEFAULT_ESTIMATOR,
+    encoding: str = "onehot",
+    balancing: str = "smote",
+):
+    check_options(estimator, encoding, balancing)
+    spec = get_estimator(estimator)
     num_transformer = StandardScaler()
-    cat_transformer = OneHotEncoder(handle_unknown="ignore")
-
-    preprocessor = ColumnTransformer(
-        [("num", num_transformer, num_features), ("cat", cat_transformer, cat_features)]
+    cat_transformer = OneHotEncoder(
+        handle_unknown="ignore", sparse_output=not spec.dense
     )
 
+    # High-cardinality columns get a compact encoding instead of one-hot
+    compact = [] if encoding == "onehot" else HIGH_CARDINALITY_FEATURES
+    transformers = [
+        ("num", num_transformer, num_features),
+        ("cat", cat_transformer, [c for c in cat_features if c not in compact]),
+    ]
+    if compact:
+        transformers.append(
+            ("compact", ENCODERS[encoding](), [c for c in cat_features if c in compact])
+        )
+    preprocessor = ColumnTransformer(transformers)
+
+    classifier = spec.build()
+    if balancing == "smote":
+        sampling = [("smote", SMOTE(random_state=42))]
+    elif balancing == "undersample":
+        sampler = RandomUnderSampler(
+            sampling_strategy=current_config.TRAINING_UNDERSAMPLE_RATIO,
+            random_state=42,
+        )
+        sampling = [("undersample", sampler)]
+    else:
+        sampling = []
+        classifier.set_params(class_weight="balanced")
+
     model = imbpipeline(
         steps=[
             ("preprocessing", preprocessor),
-            ("smote", SMOTE(random_state=42)),
-            ("classifier", RandomForestClassifier(n_estimators=100, random_state=42)),
+            *sampling,
+            ("classifier", classifier),
         ]
     )
     return model
 
 
 # -----------------------------------------------
-# 4. Main Training Routine
+# 4. Persist Model
+# -----------------------------------------------
+class SavedModel(NamedTuple):
+    version: str
+    # Sizes of the files this run wrote; compiled is None without an engine
+    artifact_bytes: int
+    compiled_bytes: Optional[int]
+    engine: Optional[ForestEngine]
+
+
+def save_model(model, path: str) -> SavedModel:
+    # Write next to the target and rename, so readers never see a partial file.
+    # The temporary name is this process's own, so a concurrent run (e.g. the
+    # CLI next to the API) cannot write into it. Uncompressed, so the registry
+    # can memory-map the arrays (MODEL_MMAP_MODE); processes still mapping the
+    # previous artifact keep its replaced file.
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(model, tmp_path, compress=0)
+    artifact_bytes = os.path.getsize(tmp_path)
+    version = file_digest(tmp_path)
+    engine, compiled_bytes = save_compiled(model, version, compiled_path(path))
+    os.replace(tmp_path, path)
+    return SavedModel(version, artifact_bytes, compiled_bytes, engine)
+
+
+def save_compiled(
+    model, version: str, path: str
+) -> Tuple[Optional[ForestEngine], Optional[int]]:
+    # Flat-array engine for MODEL_ENGINE=compiled, tagged with the pipeline's
+    # version so the registry never pairs it with another artifact
+    try:
+        engine = compile_pipeline(model, version)
+    except UnsupportedModelError as e:
+        logger.info(f"No compiled engine for this model: {e}")
+        if os.path.exists(path):
+            os.remove(path)
+        return None, None
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(engine, tmp_path, compress=0)
+    size = os.path.getsize(tmp_path)
+    os.replace(tmp_path, path)
+    return engine, size
+
+
+# -----------------------------------------------
+# 5. Evaluation report
+# -----------------------------------------------
+LATENCY_SINGLE_ROWS = 200
+LATENCY_BATCH_ROWS = 10_000
+
+
+def quality_metrics(y_true: np.ndarray, score: np.ndarray, precision: float) -> dict:
+    if not y_true.any():
+        return {"pr_auc": None, "recall_at_precision": None}
+    precisions, recalls, _ = precision_recall_curve(y_true, score)
+    reached = recalls[precisions >= precision]
+    return {
+        "pr_auc": round(float(average_precision_score(y_true, score)), 4),
+        "recall_at_precision": round(float(reached.max()) if reached.size else 0.0, 4),
+    }
+
+
+def inference_latency(loaded: LoadedModel, X: pd.DataFrame) -> dict:
+    # Single rows one call at a time, as /score sends them, then one large
+    # batch; each scored by the engine score_frame would pick for its size
+    timings = []
+    for i in range(min(LATENCY_SINGLE_ROWS, len(X))):
+        row = X.iloc[[i]]
+        started = time.perf_counter()
+        loaded.scorer(len(row)).predict_proba(row)
+        timings.append(time.perf_counter() - started)
+    batch = X.head(LATENCY_BATCH_ROWS)
+    started = time.perf_counter()
+    loaded.scorer(len(batch)).predict_proba(batch)
+    batch_seconds = time.perf_counter() - started
+    return {
+        "single_row_p50_ms": round(float(np.percentile(timings, 50)) * 1000, 3),
+        "single_row_p99_ms": round(float(np.percentile(timings, 99)) * 1000, 3),
+        "batch_rows": len(batch),
+        "batch_ms": round(batch_seconds * 1000, 3),
+        "batch_rows_per_sec": round(len(batch) / batch_seconds, 1),
+    }
+
+
+def training_report(
+    model,
+    saved: SavedModel,
+    options: dict,
+    X_test: pd.DataFrame,
+    y_test: np.ndarray,
+    fit_seconds: float,
+) -> dict:
+    fraud_col = list(model.classes_).index(1)
+    score = model.predict_proba(X_test)[:, fraud_col]
+    precision = current_config.TRAINING_REPORT_PRECISION
+    # As the registry will serve this version
+    served = current_config.MODEL_ENGINE == "compiled"
+    loaded = LoadedModel(
+        version=saved.version,
+        model=model,
+        path=current_config.MODEL_PATH,
+        mtime_ns=0,
+        size=saved.artifact_bytes,
+        loaded_at=time.time(),
+        engine=saved.engine if served else None,
+    )
+    return {
+        "model_version": saved.version,
+        **options,
+        "engine": loaded.info()["engine"],
+        "fit_seconds": round(fit_seconds, 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "artifact_bytes": saved.artifact_bytes,
+        "compiled_bytes": saved.compiled_bytes,
+        "test_rows": len(X_test),
+        "precision_target": precision,
+        **quality_metrics(y_test, score, precision),
+        **inference_latency(loaded, X_test),
+    }
+
+
+def report_path(path: str, version: str) -> str:
+    # One report per trained artifact, next to it
+    return f"{path}.{version}.report.json"
+
+
+def save_report(report: dict, path: str):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+        f.write("\n")
+
+
+# -----------------------------------------------
+# 6. Main Training Routine
 # -----------------------------------------------
-async def main():
-    print("Loading data from database...")
-    df = await fetch_transactions()
+class TrainingResult(NamedTuple):
+    path: str
+    # Rows read from the table (the sample mode trains on fewer)
+    rows: int
+    seconds: float
+    report: dict
+
+
+def _no_progress(stage: str, fraction: float):
+    pass
+
+
+async def main(
+    progress: Callable[[str, float], None] = _no_progress,
+    estimator: Optional[str] = None,
+    encoding: Optional[str] = None,
+    balancing: Optional[str] = None,
+) -> Optional[TrainingResult]:
+    started = time.perf_counter()
+    mode = current_config.TRAINING_MODE
+    options = {
+        "estimator": estimator or current_config.TRAINING_ESTIMATOR,
+        "encoding": encoding or current_config.TRAINING_CAT_ENCODING,
+        "balancing": balancing or current_config.TRAINING_BALANCING,
+    }
+    # Unknown names fail before the data is loaded
+    check_options(**options)
 
-    if df.empty:
+    progress("loading", 0.05)
+    print(f"Loading data from database ({mode} mode)...")
+    X, y, rows_read = await load_training_data(
+        mode, current_config.TRAINING_BATCH_ROWS, current_config.TRAINING_SAMPLE_ROWS
+    )
+
+    if rows_read == 0:
         print("No data found in 'transactions' table.")
-        return
-
-    print(f"Loaded {len(df)} records.")
-
-    df = preprocess_data(df)
-
-    X = df.drop("is_fraud", axis=1)
-    y = df["is_fraud"]
-
-    num_features = [
-        "amt",
-        "lat",
-        "long",
-        "city_pop",
-        "merch_lat",
-        "merch_long",
-        "distance",
-        "hour",
-        "day_of_week",
-        "month",
-    ]
-    cat_features = ["category", "gender", "merchant"]
+        return None
 
-    # Remove any features that were dropped earlier
-    num_features = [f for f in num_features if f in X.columns]
-    cat_features = [f for f in cat_features if f in X.columns]
+    print(f"Loaded {rows_read} records, training on {len(X)} ({int(y.sum())} fraud).")
+    logger.info(
+        f"Training data: {len(X)}/{rows_read} rows in {time.perf_counter() - started:.1f}s, "
+        f"peak RSS {peak_rss_mb():.0f} MB."
+    )
 
-    print("Building model pipeline...")
-    model = build_pipeline(num_features, cat_features)
+    print(f"Building model pipeline ({', '.join(options.values())})...")
+    model = build_pipeline(NUM_FEATURES, CAT_FEATURES, **options)
 
+    progress("splitting", 0.35)
     print("Splitting data...")
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, test_size=0.3, stratify=y, random_state=42
     )
 
+    progress("training", 0.4)
     print("Training model...")
+    fit_started = time.perf_counter()
     model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - fit_started
 
-    print("Saving model to fraud_model.pkl")
-    joblib.dump(model, "fraud_model.pkl")
+    progress("saving", 0.95)
+    print(f"Saving model to {current_config.MODEL_PATH}")
+    saved = save_model(model, current_config.MODEL_PATH)
+
+    progress("evaluating", 0.97)
+    report = training_report(model, saved, options, X_test, y_test, fit_seconds)
+    save_report(report, report_path(current_config.MODEL_PATH, saved.version))
+    logger.info(f"Training report: {json.dumps(report)}")
 
     print("Training complete. Model saved.")
+    seconds = time.perf_counter() - started
+    # Peak RSS is that of the whole (worker) process, not just this run
+    logger.info(
+        f"Training finished in {seconds:.1f}s, peak RSS {peak_rss_mb():.0f} MB."
+    )
+    return TrainingResult(current_config.MODEL_PATH, rows_read, seconds, report)
+
+
+# -----------------------------------------------
+# 7. Process-pool entry point (see ml/jobs.py)
+# -----------------------------------------------
+def run_training_job(
+    db_config: dict,
+    progress: Callable[[str, float], None],
+    estimator: Optional[str] = None,
+    encoding: Optional[str] = None,
+    balancing: Optional[str] = None,
+):
+    # Runs in a worker process, which needs its own database connection
+    async def _run():
+        await Tortoise.init(config=db_config)
+        try:
+            return await main(progress, estimator, encoding, balancing)
+        finally:
+            await Tortoise.close_connections()
+
+    return asyncio.run(_run())
 
 
 # Run the pipeline
 if __name__ == "__main__":
-    asyncio.run(main())
+    from database.db import tortoise_config
+    from ml.estimators import ESTIMATORS
+
+    parser = argparse.ArgumentParser(description="Train and save the fraud model.")
+    parser.add_argument("--estimator", choices=list(ESTIMATORS))
+    parser.add_argument("--encoding", choices=ENCODINGS)
+    parser.add_argument("--balancing", choices=BALANCING)
+    args = parser.parse_args()
+    run_training_job(
+        tortoise_config(), _no_progress, args.estimator, args.encoding, args.balancing
+    )
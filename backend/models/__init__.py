@@ -1,4 +1,5 @@
-from .transaction import Transaction
+from .training_job import TrainingJob
+from .transaction import Category, Merchant, Transaction
 from .user import User
 
-__all__ = ["User", "Transaction"]
+__all__ = ["User", "Transaction", "Category", "Merchant", "TrainingJob"]
@@ -0,0 +1,46 @@
+from tortoise import fields
+from tortoise.models import Model
+
+
+# Background training jobs (ml/jobs.py), shared by all worker processes
+class TrainingJob(Model):
+    id = fields.CharField(max_length=32, pk=True)
+    estimator = fields.CharField(max_length=64)
+    status = fields.CharField(max_length=16)
+    stage = fields.CharField(max_length=32, null=True)
+    progress = fields.FloatField(default=0.0)
+    # True while queued or running, NULL afterwards: the unique index lets a
+    # single job be active across all workers
+    active = fields.BooleanField(null=True, unique=True)
+    # Process that runs the job and records its progress, "<host>:<pid>"
+    worker = fields.CharField(max_length=255)
+    # Unix times, as reported by the API
+    created_at = fields.FloatField()
+    started_at = fields.FloatField(null=True)
+    finished_at = fields.FloatField(null=True)
+    model_version = fields.CharField(max_length=32, null=True)
+    error = fields.TextField(null=True)
+    report = fields.JSONField(null=True)
+
+    class Meta:
+        table = "training_jobs"
+
+    def info(self) -> dict:
+        return {
+            "job_id": self.id,
+            "estimator": self.estimator,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": round(self.progress, 3),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration": (
+                self.finished_at - self.started_at
+                if self.started_at and self.finished_at
+                else None
+            ),
+            "model_version": self.model_version,
+            "error": self.error,
+            "report": self.report,
+        }
@@ -2,13 +2,45 @@ from tortoise import fields
 from tortoise.models import Model
 
 
+class TimestampField(fields.DatetimeField):
+    # Wall-clock time as recorded in the source data, without a time zone
+    class _db_postgres:
+        SQL_TYPE = "TIMESTAMP"
+
+    def to_python_value(self, value):
+        # Read back naive too; DatetimeField would attach the server time zone
+        value = super().to_python_value(value)
+        return value if value is None else value.replace(tzinfo=None)
+
+
+# Dictionary tables: transactions store the small integer code only
+class Category(Model):
+    id = fields.SmallIntField(pk=True)
+    name = fields.CharField(max_length=50, unique=True)
+
+    class Meta:
+        table = "categories"
+
+
+class Merchant(Model):
+    id = fields.IntField(pk=True)
+    name = fields.CharField(max_length=100, unique=True)
+
+    class Meta:
+        table = "merchants"
+
+
 class Transaction(Model):
     id = fields.IntField(pk=True)
 
-    trans_date_trans_time = fields.CharField(max_length=30)
+    trans_date_trans_time = TimestampField()
     cc_num = fields.CharField(max_length=20)
-    merchant = fields.CharField(max_length=100)
-    category = fields.CharField(max_length=50)
+    merchant = fields.ForeignKeyField(
+        "models.Merchant", related_name=False, on_delete=fields.RESTRICT
+    )
+    category = fields.ForeignKeyField(
+        "models.Category", related_name=False, on_delete=fields.RESTRICT
+    )
     amt = fields.FloatField()
 
     first = fields.CharField(max_length=50)
@@ -18,16 +50,16 @@ class Transaction(Model):
     street = fields.CharField(max_length=100)
     city = fields.CharField(max_length=100)
     state = fields.CharField(max_length=2)
-    zip = fields.IntField()
+    zip = fields.CharField(max_length=10)
 
     lat = fields.FloatField()
     long = fields.FloatField()
     city_pop = fields.IntField()
 
     job = fields.CharField(max_length=100)
-    dob = fields.CharField(max_length=20)
+    dob = fields.DateField()
 
-    trans_num = fields.CharField(max_length=100)
+    trans_num = fields.CharField(max_length=100, unique=True)
     unix_time = fields.BigIntField()
 
     merch_lat = fields.FloatField()
@@ -35,10 +67,23 @@ class Transaction(Model):
 
     is_fraud = fields.BooleanField()
 
+    # Model features derived from the row, computed once at ingest
+    hour = fields.SmallIntField()
+    day_of_week = fields.SmallIntField()
+    month = fields.SmallIntField()
+    distance = fields.FloatField()
+
+    # Prediction of the model version in score_version, stored at ingest and
+    # refreshed in the background on model activation (see ml/scoring.py)
+    fraud_score = fields.FloatField(null=True)
+    predicted_fraud = fields.BooleanField(null=True)
+    score_version = fields.CharField(max_length=32, null=True)
+
     created_at = fields.DatetimeField(auto_now_add=True)
 
     class Meta:
         table = "transactions"
+        # Secondary indexes are created in database/migrations.py
 
     def __str__(self):
-        return f"Transaction {self.id} - {self.merchant} - Fraud: {self.is_fraud}"
+        return f"Transaction {self.id} - {self.merchant_id} - Fraud: {self.is_fraud}"
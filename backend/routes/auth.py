@@ -9,7 +9,7 @@ Version     : 1.1.0
 import os
 
 from authlib.integrations.starlette_client import OAuth
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from fastapi.responses import JSONResponse, RedirectResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from logger import logger
@@ -18,10 +18,11 @@ from schemas.auth import Token
 from schemas.user import UserCreate, UserOut
 from utils.auth import (
     create_access_token,
+    decode_access_token,
     get_current_user,
-    get_password_hash,
-    verify_password,
+    user_cache,
 )
+from utils.hashing import password_hasher
 
 router = APIRouter()
 oauth = OAuth()
@@ -40,7 +41,7 @@ oauth.register(
 # Email/Password Signup
 # -------------------------------------------
 @router.post("/signup", response_model=UserOut)
-async def signup(user: UserCreate):
+async def signup(user: UserCreate, response: Response):
     try:
         existing_user = await User.get_or_none(email=user.email)
         if existing_user:
@@ -48,14 +49,19 @@ async def signup(user: UserCreate):
                 status_code=status.HTTP_409_CONFLICT,
                 detail="User already exists",
             )
+        # bcrypt runs in the hashing pool, not on the event loop
+        password_hash, timing = await password_hasher.hash(user.password)
+        response.headers["Server-Timing"] = timing.server_timing()
         user_obj = await User.create(
             username=user.username,
             email=user.email,
             firstname=user.firstname,
             lastname=user.lastname,
-            password_hash=get_password_hash(user.password),
+            password_hash=password_hash,
         )
         return await UserOut.from_tortoise_orm(user_obj)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Signup error: {e}")
         raise HTTPException(
@@ -73,15 +79,26 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
         username=form_data.username
     ) or await User.get_or_none(email=form_data.username)
 
-    if not user or not verify_password(form_data.password, user.password_hash):
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid credentials",
+        )
+
+    valid, timing = await password_hasher.verify(form_data.password, user.password_hash)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials",
+            headers={"Server-Timing": timing.server_timing()},
         )
 
     token = create_access_token({"sub": str(user.id)})
 
-    response = JSONResponse(content={"message": "Login successful"})
+    response = JSONResponse(
+        content={"message": "Login successful"},
+        headers={"Server-Timing": timing.server_timing()},
+    )
     response.set_cookie(
         key="access_token",
         value=token,
@@ -144,7 +161,14 @@ async def get_profile(user: User = Depends(get_current_user)):
 
 
 @router.post("/logout")
-async def logout():
+async def logout(request: Request):
+    token = request.cookies.get("access_token")
+    if token:
+        try:
+            user_cache.invalidate(decode_access_token(token)["sub"])
+        except HTTPException:
+            pass
+
     response = JSONResponse(content={"message": "Logged out"})
     response.delete_cookie("access_token")
     return response
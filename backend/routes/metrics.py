@@ -0,0 +1,108 @@
+import os
+
+from config import current_config
+from database.pool import pool_stats
+from fastapi import APIRouter, Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import Collector
+from utils.auth import user_cache
+from utils.hashing import password_hasher
+
+router = APIRouter()
+
+
+class ComponentCollector(Collector):
+    # Counters kept by the user cache, the password hasher and the database
+    # pool, read when /metrics is scraped
+    def collect(self):
+        users = user_cache.stats()
+        yield GaugeMetricFamily(
+            "user_cache_entries", "Users in the auth cache.", value=users["size"]
+        )
+        for name in ("hits", "misses", "evictions"):
+            yield CounterMetricFamily(
+                f"user_cache_{name}", f"Auth cache {name}.", value=users[name]
+            )
+
+        hashes = CounterMetricFamily(
+            "password_hash", "bcrypt operations.", labels=["operation"]
+        )
+        rejected = CounterMetricFamily(
+            "password_hash_rejected",
+            "bcrypt operations refused with a 503 after the queue timeout.",
+            labels=["operation"],
+        )
+        queue_seconds = CounterMetricFamily(
+            "password_hash_queue_seconds",
+            "Time spent waiting for a bcrypt worker.",
+            labels=["operation"],
+        )
+        hash_seconds = CounterMetricFamily(
+            "password_hash_seconds", "Time spent in bcrypt.", labels=["operation"]
+        )
+        for operation, stats in password_hasher.stats.items():
+            hashes.add_metric([operation], stats.count)
+            rejected.add_metric([operation], stats.rejected)
+            queue_seconds.add_metric([operation], stats.queue_seconds)
+            hash_seconds.add_metric([operation], stats.hash_seconds)
+        yield from (hashes, rejected, queue_seconds, hash_seconds)
+
+        pool = pool_stats()
+        if pool is None:
+            return
+        for name in ("min_size", "max_size", "size", "idle", "in_use", "waiting"):
+            yield GaugeMetricFamily(
+                f"db_pool_{name}", f"Database pool {name}.", value=pool[name]
+            )
+        yield CounterMetricFamily(
+            "db_pool_acquired", "Connections handed out.", value=pool["acquired"]
+        )
+        yield CounterMetricFamily(
+            "db_pool_acquire_wait_seconds",
+            "Time spent waiting for a pooled connection.",
+            value=pool["wait_seconds"],
+        )
+        yield GaugeMetricFamily(
+            "db_pool_acquire_max_wait_seconds",
+            "Longest wait for a pooled connection.",
+            value=pool["max_wait_seconds"],
+        )
+
+
+class WorkerCollector(Collector):
+    # Another collector's per-process values, labelled with this worker's pid so
+    # series of different workers are never mistaken for one another
+    def __init__(self, collector: Collector):
+        self.collector = collector
+
+    def collect(self):
+        worker = str(os.getpid())
+        for family in self.collector.collect():
+            family.samples = [
+                sample._replace(labels={**sample.labels, "worker": worker})
+                for sample in family.samples
+            ]
+            yield family
+
+
+if current_config.PROMETHEUS_MULTIPROC_DIR:
+    # Metric values of all workers, from PROMETHEUS_MULTIPROC_DIR
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(WorkerCollector(ComponentCollector()))
+else:
+    registry = REGISTRY
+    registry.register(ComponentCollector())
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    # Prometheus text format
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
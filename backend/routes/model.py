@@ -1,23 +1,61 @@
-from pathlib import Path
+from typing import List, Optional
 
-from fastapi import APIRouter, HTTPException, status
-from ml.train_model import main as train_main
+from fastapi import APIRouter, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+from ml.estimators import ESTIMATORS, UnknownEstimatorError
+from ml.jobs import JobConflictError, training_jobs
+from ml.registry import model_registry
 
 router = APIRouter()
 
 
-@router.post("/train-model")
-async def train_model_route():
+@router.post("/train-model", status_code=status.HTTP_202_ACCEPTED)
+async def train_model_route(estimator: Optional[str] = Query(None, max_length=64)):
+    # Training runs in a worker process; poll the job for its outcome
     try:
-        await train_main()
-        if not Path("fraud_model.pkl").exists():
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Model training failed.",
-            )
-        return {"message": "Model trained and saved successfully."}
+        job = await training_jobs.submit(estimator)
+    except UnknownEstimatorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except JobConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Training failed: {str(e)}",
         )
+    return {
+        "message": "Model training started.",
+        "job_id": job.id,
+        "status": job.status,
+    }
+
+
+@router.get("/train-model/estimators")
+async def list_estimators() -> dict:
+    return {name: spec.description for name, spec in ESTIMATORS.items()}
+
+
+@router.get("/train-model/jobs")
+async def list_training_jobs() -> List[dict]:
+    return [job.info() for job in await training_jobs.list()]
+
+
+@router.get("/train-model/jobs/{job_id}")
+async def training_job_status(job_id: str):
+    job = await training_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Training job not found."
+        )
+    return job.info()
+
+
+@router.get("/model")
+async def model_info():
+    try:
+        loaded = await run_in_threadpool(model_registry.get)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="No trained model found."
+        )
+    return loaded.info()
@@ -1,58 +1,235 @@
-import joblib
-import numpy as np
+import json
+from typing import AsyncIterator, List, Optional, Tuple, Union
+
 import pandas as pd
-from fastapi import APIRouter, HTTPException, status
+from config import current_config
+from database.dictionary import decode_columns
+from database.snapshot import transaction_snapshot
+from fastapi import APIRouter, Body, HTTPException, Query, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from logger import logger
+from ml.batcher import score_batcher
+from ml.features import feature_transformer
+from ml.registry import LoadedModel
+from ml.scoring import current_model, rescorer, score_frame
 from models.transaction import Transaction
+from schemas.transaction import ScoreResult, TransactionIn
+from tortoise.expressions import Q
+from utils.metrics import ML_STAGE_SECONDS
 
 router = APIRouter()
 
+predict_logger = logger.getChild("predict")
+# Flagged trans_num values included in the /predict-fraud log record
+LOGGED_TRANS_NUMS = 20
+
+
+# -------------------------------------------
+# Batch helpers for the paginated / streaming variants
+# -------------------------------------------
+async def fetch_scored_batch(
+    after_id: int, limit: int, fraud_only: bool, loaded: Optional[LoadedModel]
+) -> Tuple[pd.DataFrame, Optional[int]]:
+    """
+    Up to `limit` rows after `after_id` with their predictions, and the cursor
+    of the next batch (None at the end). With `fraud_only`, rows not flagged
+    once scored are dropped, so a batch can be shorter than a full read.
+    """
+    # Keyset read on the primary key; fraud_only also reads unscored rows, as
+    # the current model may flag them
+    query = Transaction.filter(id__gt=after_id)
+    if fraud_only:
+        query = query.filter(Q(predicted_fraud=True) | Q(score_version__isnull=True))
+    rows = await query.order_by("id").limit(limit).values()
+
+    df = pd.DataFrame(rows)
+    if df.empty:
+        return df, None
+    next_cursor = int(df["id"].iloc[-1]) if len(df) == limit else None
+    df = await decode_columns(df)
+
+    # Only rows that were never scored need the model; the rescorer persists them
+    unscored = df["score_version"].isna()
+    if unscored.any() and loaded is not None:
+        score, predicted = await run_in_threadpool(score_frame, loaded, df[unscored])
+        df.loc[unscored, "fraud_score"] = score
+        df.loc[unscored, "predicted_fraud"] = predicted
+        df.loc[unscored, "score_version"] = loaded.version
+        rescorer.schedule()
+    if fraud_only:
+        df = df[df["predicted_fraud"].eq(True)]
+    return df, next_cursor
+
+
+def records_json(df: pd.DataFrame, lines: bool = False) -> str:
+    # pandas serializes the whole batch in C, NaN becomes null
+    if df.empty:
+        return "" if lines else "[]"
+    with ML_STAGE_SECONDS.labels("serialization").time():
+        body = df.to_json(
+            orient="records", date_format="iso", double_precision=15, lines=lines
+        )
+    if lines and not body.endswith("\n"):
+        body += "\n"
+    return body
+
 
 @router.get("/predict-fraud")
 async def predict_fraud():
     try:
-        model = joblib.load("fraud_model.pkl")
-
-        data = await Transaction.all().values()
-        df = pd.DataFrame(data)
+        # Predictions are stored at ingest / by the rescorer, so this is a read
+        if current_config.SNAPSHOT_ENABLED:
+            # Memory-mapped Arrow snapshot, refreshed only when the data changed
+            table = await transaction_snapshot.table()
+            df = await run_in_threadpool(table.to_pandas)
+        else:
+            data = await Transaction.all().order_by("id").values()
+            df = pd.DataFrame(data)
 
         if df.empty:
             return {"fraudulent": [], "all": []}
 
-        df["distance"] = np.sqrt(
-            (df["merch_lat"] - df["lat"]) ** 2 + (df["merch_long"] - df["long"]) ** 2
-        )
-        df["hour"] = pd.to_datetime(df["trans_date_trans_time"]).dt.hour
-        df["day_of_week"] = pd.to_datetime(df["trans_date_trans_time"]).dt.dayofweek
-        df["month"] = pd.to_datetime(df["trans_date_trans_time"]).dt.month
-        drop_cols = [
-            "id",
-            "trans_date_trans_time",
-            "first",
-            "last",
-            "street",
-            "city",
-            "state",
-            "zip",
-            "dob",
-            "trans_num",
-            "unix_time",
-            "cc_num",
-            "created_at",
-        ]
-        X = df.drop(
-            columns=[col for col in drop_cols if col in df.columns], errors="ignore"
-        )
-
-        df["predicted_fraud"] = model.predict(X)
-
-        fraud = df[df["predicted_fraud"] == 1].to_dict(orient="records")
-        all_data = df.to_dict(orient="records")
-
-        logger.info({"fraudulent": fraud})
+        # Derived features are stored columns; only the coded names are mapped
+        df = await decode_columns(df)
+
+        # Rows stored before any model existed are scored here once and queued
+        # for the background rescorer, which persists their predictions
+        unscored = df["score_version"].isna()
+        if unscored.any():
+            # Hold on to this snapshot for the whole request, even if a new
+            # model is activated meanwhile
+            loaded = await run_in_threadpool(current_model)
+            if loaded is None:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="No trained model available.",
+                )
+            score, predicted = await run_in_threadpool(
+                score_frame, loaded, df[unscored]
+            )
+            df.loc[unscored, "fraud_score"] = score
+            df.loc[unscored, "predicted_fraud"] = predicted
+            df.loc[unscored, "score_version"] = loaded.version
+            rescorer.schedule()
+
+        df["predicted_fraud"] = df["predicted_fraud"].astype(int)
+        flagged = df["predicted_fraud"] == 1
+
+        with ML_STAGE_SECONDS.labels("serialization").time():
+            fraud = df[flagged].to_dict(orient="records")
+            all_data = df.to_dict(orient="records")
+
+        # A summary, not the rows: this runs on every request
+        predict_logger.info(
+            f"Served {len(all_data)} transactions, {len(fraud)} flagged as fraud.",
+            extra={
+                "fields": {
+                    "rows": len(all_data),
+                    "fraudulent": len(fraud),
+                    "sample_trans_nums": (
+                        df.loc[flagged, "trans_num"].head(LOGGED_TRANS_NUMS).tolist()
+                    ),
+                }
+            },
+        )
         return {"fraudulent": fraud, "all": all_data}
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
         )
+
+
+@router.get("/predict-fraud/page")
+async def predict_fraud_page(
+    cursor: int = Query(0, ge=0, description="Last id of the previous page"),
+    limit: int = Query(500, ge=1, le=5000),
+    fraud_only: bool = Query(False),
+):
+    try:
+        loaded = await run_in_threadpool(current_model)
+        df, next_cursor = await fetch_scored_batch(cursor, limit, fraud_only, loaded)
+        body = await run_in_threadpool(records_json, df)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
+
+    return Response(
+        content=f'{{"items": {body}, "next_cursor": {json.dumps(next_cursor)}}}',
+        media_type="application/json",
+    )
+
+
+@router.get("/predict-fraud/stream")
+async def predict_fraud_stream(
+    fraud_only: bool = Query(False),
+    batch_size: int = Query(1000, ge=1, le=10000),
+):
+    # One model snapshot for the whole stream
+    loaded = await run_in_threadpool(current_model)
+
+    async def ndjson() -> AsyncIterator[str]:
+        after_id = 0
+        while after_id is not None:
+            df, after_id = await fetch_scored_batch(
+                after_id, batch_size, fraud_only, loaded
+            )
+            if not df.empty:
+                yield await run_in_threadpool(records_json, df, True)
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+@router.post("/score")
+async def score(payload: Union[TransactionIn, List[TransactionIn]] = Body(...)):
+    items = payload if isinstance(payload, list) else [payload]
+    if not items or len(items) > current_config.SCORE_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Send between 1 and {current_config.SCORE_MAX_ITEMS} transactions.",
+        )
+
+    records = [item.model_dump() for item in items]
+    # Parsed here, so bad input is rejected before it joins a batch
+    try:
+        timestamps = feature_transformer.parse_timestamps(
+            pd.Series([record["trans_date_trans_time"] for record in records])
+        )
+        if pd.isna(timestamps).any():
+            raise ValueError("empty value")
+    except (TypeError, ValueError, OverflowError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Invalid trans_date_trans_time: {e}",
+        )
+    for record, timestamp in zip(records, pd.DatetimeIndex(timestamps)):
+        record["trans_date_trans_time"] = timestamp
+
+    try:
+        # Coalesced with concurrent requests into one vectorized model call
+        result = await score_batcher.submit(records)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="No trained model available.",
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
+
+    return {
+        "model_version": result.version,
+        "results": [
+            ScoreResult(
+                trans_num=item.trans_num,
+                fraud_probability=float(probability),
+                predicted_fraud=bool(flag),
+            )
+            for item, probability, flag in zip(items, result.scores, result.predicted)
+        ],
+    }
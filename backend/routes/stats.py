@@ -0,0 +1,25 @@
+from database.pool import pool_stats
+from database.stats import compute_stats, stats_cache
+from fastapi import APIRouter, HTTPException, Query, status
+
+router = APIRouter()
+
+
+@router.get("/stats")
+async def dashboard_stats(merchants: int = Query(20, ge=1, le=500)):
+    # Fraud counts and rates by category, merchant and time of transaction
+    try:
+        version, stats, cached = await stats_cache.get(
+            merchants, lambda: compute_stats(merchants)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
+    return {"data_version": version, "cached": cached, **stats}
+
+
+@router.get("/stats/db-pool")
+async def db_pool_stats():
+    # Connection pool of this worker process; null when the database has no pool
+    return {"pool": pool_stats()}
@@ -1,151 +1,198 @@
-from io import StringIO
+from enum import Enum
 from typing import Optional
 
 import pandas as pd
+from config import current_config
+from database.bulk import LoadStats, bulk_load_transactions
+from database.data_version import VersionedCache, bump_data_version
+from database.dictionary import (
+    PendingCodes,
+    decode_columns,
+    encode_columns,
+    stored_columns,
+)
 from fastapi import APIRouter, File, HTTPException, Query, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
 from logger import logger
+from ml.scoring import SCORE_COLUMNS, attach_scores, current_model
 from models.transaction import Transaction
+from tortoise.expressions import Q
 from tortoise.transactions import in_transaction
+from utils.ingest import (
+    CHUNK_COLUMNS,
+    IngestError,
+    iter_csv_chunks,
+    missing_columns,
+    read_header,
+)
+from utils.metrics import INGEST_DUPLICATES, INGEST_ROWS, INGEST_ROWS_PER_SECOND
+from utils.pagination import decode_cursor, encode_cursor
 
 router = APIRouter()
 
+TRANSACTION_LIST_COLUMNS = [
+    "id",
+    "merchant_id",
+    "amt",
+    "category_id",
+    "city",
+    "is_fraud",
+    "trans_date_trans_time",
+    "created_at",
+]
+
+count_cache = VersionedCache()
+
+
+class UploadMode(str, Enum):
+    append = "append"
+    replace = "replace"
+
 
 @router.post("/upload-csv")
-async def upload_csv(file: UploadFile = File(...)):
+async def upload_csv(
+    file: UploadFile = File(...),
+    mode: UploadMode = Query(UploadMode.append),
+):
     if not file.filename.endswith(".csv"):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="File must be a CSV format."
         )
 
-    contents = await file.read()
+    # The upload is already spooled to disk by Starlette; read it from there in
+    # fixed-size chunks so memory stays bounded regardless of file size.
     try:
-        df = pd.read_csv(StringIO(contents.decode("utf-8")))
-        df.columns = df.columns.str.strip().str.lower()
+        header = await run_in_threadpool(read_header, file.file)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"CSV parsing failed: {str(e)}",
         )
 
-    required_columns = {
-        "trans_date_trans_time",
-        "cc_num",
-        "merchant",
-        "category",
-        "amt",
-        "first",
-        "last",
-        "gender",
-        "street",
-        "city",
-        "state",
-        "zip",
-        "lat",
-        "long",
-        "city_pop",
-        "job",
-        "dob",
-        "trans_num",
-        "unix_time",
-        "merch_lat",
-        "merch_long",
-        "is_fraud",
-    }
-
-    if not required_columns.issubset(df.columns):
-        missing = required_columns - set(df.columns)
+    missing = missing_columns(header)
+    if missing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Missing columns in CSV: {', '.join(missing)}",
         )
 
-    # Remove duplicates based on unique transaction number
-    existing_trans_nums = await Transaction.filter(
-        trans_num__in=df["trans_num"].tolist()
-    ).values_list("trans_num", flat=True)
+    chunks = iter_csv_chunks(file.file, header, current_config.UPLOAD_CHUNK_ROWS)
+    load = LoadStats("", 0, 0.0)
 
-    df = df[~df["trans_num"].isin(existing_trans_nums)]
+    # Score-on-ingest with one model snapshot for the whole upload; without a
+    # trained model the rows are stored unscored and picked up by the rescorer.
+    loaded = await run_in_threadpool(current_model)
+    columns = stored_columns(CHUNK_COLUMNS) + (SCORE_COLUMNS if loaded else [])
 
-    # Convert and prepare Transaction objects
+    # Codes added by this upload are shared with other requests once it commits
+    pending = PendingCodes()
     try:
-        transactions = [
-            Transaction(
-                trans_date_trans_time=row["trans_date_trans_time"],
-                cc_num=str(row["cc_num"]),
-                merchant=row["merchant"],
-                category=row["category"],
-                amt=float(row["amt"]),
-                first=row["first"],
-                last=row["last"],
-                gender=row["gender"],
-                street=row["street"],
-                city=row["city"],
-                state=row["state"],
-                zip=str(row["zip"]),
-                lat=float(row["lat"]),
-                long=float(row["long"]),
-                city_pop=int(row["city_pop"]),
-                job=row["job"],
-                dob=row["dob"],
-                trans_num=row["trans_num"],
-                unix_time=int(row["unix_time"]),
-                merch_lat=float(row["merch_lat"]),
-                merch_long=float(row["merch_long"]),
-                is_fraud=bool(row["is_fraud"]),
-            )
-            for _, row in df.iterrows()
-        ]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Data conversion error: {str(e)}")
-
-    try:
-        async with in_transaction():
-            # Clear transactions in the transactions table
-            await Transaction.all().delete()
-
-            # Insert in bulk inside transaction
-            await Transaction.bulk_create(transactions)
+        async with in_transaction() as connection:
+            if mode == UploadMode.replace:
+                # Clear transactions in the transactions table
+                await Transaction.all().delete()
+
+            while True:
+                try:
+                    chunk = await run_in_threadpool(next, chunks, None)
+                except IngestError as e:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"Data conversion error: {str(e)}",
+                    )
+                except Exception as e:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"CSV parsing failed: {str(e)}",
+                    )
+                if chunk is None:
+                    break
+                if loaded is not None:
+                    chunk = await run_in_threadpool(attach_scores, loaded, chunk)
+                chunk = await encode_columns(chunk, connection, pending)
+
+                # Insert in bulk inside transaction, one columnar chunk at a time;
+                # trans_num values already stored are skipped by the database
+                stats = await bulk_load_transactions(chunk, columns, connection)
+                load = LoadStats(
+                    stats.method,
+                    load.rows + stats.rows,
+                    load.seconds + stats.seconds,
+                    load.duplicates + stats.duplicates,
+                )
+
+            # Invalidates read caches in every worker once this commits
+            await bump_data_version(connection)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to insert records: {str(e)}",
         )
 
+    pending.commit()
+    INGEST_ROWS.inc(load.rows)
+    INGEST_DUPLICATES.inc(load.duplicates)
+    if load.seconds > 0:
+        INGEST_ROWS_PER_SECOND.set(load.rows_per_sec)
     logger.info(
-        f"Cleared old records and Inserted {len(transactions)} new transactions."
+        f"Upload ({mode.value}): inserted {load.rows} new transactions, skipped "
+        f"{load.duplicates} duplicates via {load.method} "
+        f"({load.rows_per_sec:.0f} rows/sec)."
     )
 
     return {
-        "message": f"CSV uploaded successfully. Inserted {len(transactions)} records."
+        "message": f"CSV uploaded successfully. Inserted {load.rows} records.",
+        "load": load.as_dict(),
     }
 
 
+async def _count_transactions(is_fraud: Optional[bool]) -> int:
+    query = Transaction.all()
+    if is_fraud is not None:
+        query = query.filter(is_fraud=is_fraud)
+    return await query.count()
+
+
 @router.get("/transactions")
 async def get_transactions(
     limit: int = Query(10, ge=1),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(
+        None, description="next_cursor of the previous page; replaces offset"
+    ),
     is_fraud: Optional[bool] = Query(None),
 ):
-    query = Transaction.all()
+    # Ordered on (created_at, id), served by the indexes from migration 0004
+    query = Transaction.all().order_by("created_at", "id")
 
     if is_fraud is not None:
         query = query.filter(is_fraud=is_fraud)
 
-    transactions = await query.offset(offset).limit(limit)
-    total = await query.count()
+    if cursor is not None:
+        try:
+            created_at, last_id = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        # (created_at, id) > cursor, written so the index range starts at created_at
+        query = query.filter(created_at__gte=created_at).filter(
+            Q(created_at__gt=created_at) | Q(id__gt=last_id)
+        )
+    else:
+        query = query.offset(offset)
+
+    rows = await query.limit(limit).values(*TRANSACTION_LIST_COLUMNS)
+    # Exact count per filter, cached until the next write to transactions
+    _, total, _ = await count_cache.get(is_fraud, lambda: _count_transactions(is_fraud))
 
+    last = rows[-1] if len(rows) == limit else None
+    page = await decode_columns(pd.DataFrame(rows, columns=TRANSACTION_LIST_COLUMNS))
+    page["is_fraud"] = page["is_fraud"].astype(bool)
     return {
-        "transactions": [
-            {
-                "id": t.id,
-                "merchant": t.merchant,
-                "amt": t.amt,
-                "category": t.category,
-                "city": t.city,
-                "is_fraud": bool(t.is_fraud),
-                "trans_date_trans_time": t.trans_date_trans_time,
-            }
-            for t in transactions
-        ],
+        "transactions": page.drop(columns="created_at").to_dict(orient="records"),
         "total": total,
+        "next_cursor": (
+            encode_cursor(last["created_at"], last["id"]) if last else None
+        ),
     }
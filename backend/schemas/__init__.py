@@ -1,5 +1,5 @@
 from .auth import Token, TokenData
-from .transaction import TransactionOut
+from .transaction import ScoreResult, TransactionIn, TransactionOut
 from .user import UserCreate, UserOut, UserSearchResult
 
 __all__ = [
@@ -9,4 +9,6 @@ __all__ = [
     "UserOut",
     "UserSearchResult",
     "TransactionOut",
+    "TransactionIn",
+    "ScoreResult",
 ]
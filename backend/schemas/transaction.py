@@ -1,4 +1,41 @@
+from typing import Optional
+
 from models.transaction import Transaction
+from pydantic import BaseModel, ConfigDict
 from tortoise.contrib.pydantic import pydantic_model_creator
 
 TransactionOut = pydantic_model_creator(Transaction, name="TransactionOut")
+
+
+class TransactionIn(BaseModel):
+    # One transaction in the /upload-csv column schema
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+
+    trans_date_trans_time: str
+    cc_num: str
+    merchant: str
+    category: str
+    amt: float
+    first: str
+    last: str
+    gender: str
+    street: str
+    city: str
+    state: str
+    zip: str
+    lat: float
+    long: float
+    city_pop: int
+    job: str
+    dob: str
+    trans_num: str
+    unix_time: int
+    merch_lat: float
+    merch_long: float
+    is_fraud: Optional[bool] = None
+
+
+class ScoreResult(BaseModel):
+    trans_num: str
+    fraud_probability: float
+    predicted_fraud: bool
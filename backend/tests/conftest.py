@@ -0,0 +1,61 @@
+import asyncio
+
+import httpx
+import pandas as pd
+import pytest
+from database import dictionary
+from database.data_version import VersionedCache
+from database.db import DB_MODULES, create_schema
+from fastapi import FastAPI
+from routes import upload
+from tortoise import Tortoise
+
+
+@pytest.fixture
+def run_db(monkeypatch):
+    """Run a coroutine function against a fresh in-memory SQLite database."""
+    # Process-wide mirrors of the database would outlive it
+    for col, codebook in dictionary.CODEBOOKS.items():
+        monkeypatch.setitem(
+            dictionary.CODEBOOKS, col, dictionary.Codebook(codebook.model)
+        )
+    monkeypatch.setattr(upload, "count_cache", VersionedCache())
+    # Rows are stored unscored; no model is needed to test storage
+    monkeypatch.setattr(upload, "current_model", lambda: None)
+
+    def run(test):
+        async def main():
+            await Tortoise.init(db_url="sqlite://:memory:", modules=DB_MODULES)
+            try:
+                await create_schema()
+                return await test()
+            finally:
+                await Tortoise.close_connections()
+
+        return asyncio.run(main())
+
+    return run
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(upload.router)
+    return lambda: httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    )
+
+
+@pytest.fixture
+def upload_csv():
+    # Posts `df` as a CSV file and returns the load statistics
+    async def post(api: httpx.AsyncClient, df: pd.DataFrame, mode: str = "append"):
+        response = await api.post(
+            "/upload-csv",
+            params={"mode": mode},
+            files={"file": ("transactions.csv", df.to_csv(index=False).encode())},
+        )
+        assert response.status_code == 200, response.text
+        return response.json()["load"]
+
+    return post
@@ -0,0 +1,75 @@
+import pandas as pd
+from benchmarks.synthetic import generate_transactions
+from config import current_config
+from database.bulk import bulk_load_transactions
+from database.dictionary import encode_columns, stored_columns
+from models.transaction import Transaction
+from utils.ingest import CHUNK_COLUMNS, coerce_chunk
+
+
+async def stored_trans_nums():
+    return set(await Transaction.all().values_list("trans_num", flat=True))
+
+
+def test_overlapping_uploads_skip_stored_rows(run_db, client, upload_csv, monkeypatch):
+    # Small chunks, so duplicates are found across chunks as well
+    monkeypatch.setattr(current_config, "UPLOAD_CHUNK_ROWS", 16)
+    df = generate_transactions(150, seed=1)
+
+    async def scenario():
+        async with client() as api:
+            first = await upload_csv(api, df.iloc[:100])
+            second = await upload_csv(api, df.iloc[50:])
+            again = await upload_csv(api, df)
+        return first, second, again, await stored_trans_nums()
+
+    first, second, again, stored = run_db(scenario)
+
+    assert (first["rows"], first["duplicates"]) == (100, 0)
+    assert (second["rows"], second["duplicates"]) == (50, 50)
+    assert (again["rows"], again["duplicates"]) == (0, 150)
+    assert stored == set(df["trans_num"])
+
+
+def test_replace_clears_previous_rows(run_db, client, upload_csv):
+    df = generate_transactions(150, seed=1)
+
+    async def scenario():
+        async with client() as api:
+            await upload_csv(api, df.iloc[:100])
+            load = await upload_csv(api, df.iloc[50:], mode="replace")
+        return load, await stored_trans_nums()
+
+    load, stored = run_db(scenario)
+
+    # Rows stored before are gone, so none of the new ones are duplicates
+    assert (load["rows"], load["duplicates"]) == (100, 0)
+    assert stored == set(df["trans_num"].iloc[50:])
+
+
+def test_bulk_load_counts_duplicates(run_db):
+    chunk = coerce_chunk(generate_transactions(40, seed=1))
+    columns = stored_columns(CHUNK_COLUMNS)
+
+    async def scenario():
+        batch = await encode_columns(chunk)
+        first = await bulk_load_transactions(batch.iloc[:25], columns)
+        second = await bulk_load_transactions(batch, columns)
+        rows = (
+            await Transaction.all()
+            .order_by("trans_num")
+            .values("trans_num", "amt", "trans_date_trans_time")
+        )
+        return first, second, pd.DataFrame(rows)
+
+    first, second, rows = run_db(scenario)
+
+    assert (first.method, first.rows, first.duplicates) == ("executemany", 25, 0)
+    assert (second.rows, second.duplicates) == (15, 25)
+    expected = chunk.sort_values("trans_num").reset_index(drop=True)
+    assert rows["trans_num"].tolist() == expected["trans_num"].tolist()
+    assert rows["amt"].tolist() == expected["amt"].tolist()
+    assert (
+        pd.to_datetime(rows["trans_date_trans_time"]).tolist()
+        == expected["trans_date_trans_time"].tolist()
+    )
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+from ml.encoders import FrequencyEncoder, TargetEncoder
+
+
+def test_target_encoder_training_rows_are_out_of_fold():
+    # Every merchant appears once, so its own label is all there is to learn
+    X = pd.DataFrame({"merchant": [f"m{i}" for i in range(100)]})
+    y = np.array([1, 0] * 50)
+    encoder = TargetEncoder(smoothing=1.0, cv=5)
+
+    encoded = encoder.fit_transform(X, y)
+
+    # Unseen in the other folds: every row gets their fraud rate, not its label
+    np.testing.assert_array_equal(encoded[:, 0], 0.5)
+    # New rows are encoded with the rates of all training rows
+    np.testing.assert_array_equal(encoder.transform(X)[:, 0], (y + 0.5) / 2)
+
+
+def test_target_encoder_unseen_categories_get_the_prior():
+    X = pd.DataFrame({"merchant": ["a", "a", "b", "b"] * 10})
+    y = np.array([1, 0, 0, 0] * 10)
+    encoder = TargetEncoder().fit(X, y)
+
+    encoded = encoder.transform(pd.DataFrame({"merchant": ["a", "c"]}))
+
+    assert encoded[0, 0] > y.mean()
+    assert encoded[1, 0] == y.mean()
+
+
+def test_frequency_encoder():
+    X = pd.DataFrame({"merchant": ["a", "a", "a", "b"]})
+    encoder = FrequencyEncoder()
+
+    encoded = encoder.fit_transform(X)
+
+    np.testing.assert_array_equal(encoded[:, 0], [0.75, 0.75, 0.75, 0.25])
+    assert encoder.transform(pd.DataFrame({"merchant": ["c"]}))[0, 0] == 0.0
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from benchmarks.synthetic import generate_transactions
+from ml.features import CAT_FEATURES, NUM_FEATURES, feature_transformer
+from ml.forest_engine import CHUNK_ROWS, UnsupportedModelError, compile_pipeline
+from ml.train_model import build_pipeline
+
+
+def features(rows: int, seed: int, fraud_rate: float = 0.005):
+    df = generate_transactions(rows, fraud_rate=fraud_rate, seed=seed)
+    return feature_transformer.transform(df), df["is_fraud"].to_numpy()
+
+
+@pytest.fixture(scope="module")
+def train_set():
+    # Enough fraud for every encoding to split on
+    return features(3000, seed=1, fraud_rate=0.05)
+
+
+@pytest.fixture(scope="module")
+def test_set():
+    # Another seed and merchant pool: most merchants are unseen in training
+    X, _ = features(CHUNK_ROWS + 500, seed=2)
+    X = X.copy()
+    X.loc[X.index[:20], "category"] = "not_a_category"
+    X.loc[X.index[20:40], "merchant"] = "fraud_Not A Merchant"
+    return X
+
+
+@pytest.mark.parametrize("encoding", ["onehot", "frequency", "target"])
+@pytest.mark.parametrize("balancing", ["smote", "class_weight"])
+def test_matches_pipeline(train_set, test_set, encoding, balancing):
+    model = build_pipeline(
+        NUM_FEATURES, CAT_FEATURES, "shallow_forest", encoding, balancing
+    )
+    model.fit(*train_set)
+    engine = compile_pipeline(model, "test")
+
+    assert engine.source_version == "test"
+    np.testing.assert_array_equal(engine.classes_, model.classes_)
+    # Bit for bit, across several chunks and for single rows
+    np.testing.assert_array_equal(
+        engine.predict_proba(test_set), model.predict_proba(test_set)
+    )
+    for i in (0, 25, len(test_set) - 1):
+        row = test_set.iloc[[i]]
+        np.testing.assert_array_equal(
+            engine.predict_proba(row), model.predict_proba(row)
+        )
+
+
+@pytest.mark.parametrize(
+    "estimator, encoding",
+    [("logistic_regression", "onehot"), ("random_forest", "hashed")],
+)
+def test_unsupported_models(train_set, estimator, encoding):
+    model = build_pipeline(NUM_FEATURES, CAT_FEATURES, estimator, encoding)
+    model.fit(*train_set)
+    with pytest.raises(UnsupportedModelError):
+        compile_pipeline(model, "test")
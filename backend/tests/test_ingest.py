@@ -0,0 +1,114 @@
+import io
+
+import pandas as pd
+import pytest
+from benchmarks.synthetic import generate_transactions
+from config import current_config
+from models.transaction import Transaction
+from utils.ingest import (
+    CHUNK_COLUMNS,
+    IngestError,
+    iter_csv_chunks,
+    missing_columns,
+    read_header,
+)
+
+
+def csv_bytes(df: pd.DataFrame) -> io.BytesIO:
+    return io.BytesIO(df.to_csv(index=False).encode())
+
+
+def test_chunks_are_bounded_and_cover_the_file():
+    df = generate_transactions(30, seed=1)
+    fileobj = csv_bytes(df)
+
+    chunks = list(iter_csv_chunks(fileobj, read_header(fileobj), chunk_rows=7))
+
+    assert [len(chunk) for chunk in chunks] == [7, 7, 7, 7, 2]
+    combined = pd.concat(chunks, ignore_index=True)
+    assert list(combined.columns) == CHUNK_COLUMNS
+    assert combined["trans_num"].tolist() == df["trans_num"].tolist()
+    # Typed once at ingest, including the stored features
+    assert combined["trans_date_trans_time"].dtype == "datetime64[ns]"
+    assert combined["amt"].dtype == "float64"
+    assert combined["is_fraud"].dtype == bool
+    assert combined["cc_num"].tolist() == df["cc_num"].tolist()
+    assert combined["hour"].between(0, 23).all()
+
+
+def test_header_is_normalized_and_extra_columns_are_skipped():
+    df = generate_transactions(5, seed=1)
+    df = df.rename(columns={"amt": " AMT ", "is_fraud": "Is_Fraud"})
+    df.insert(0, "Unnamed: 0", range(5))
+    fileobj = csv_bytes(df)
+
+    header = read_header(fileobj)
+    (chunk,) = iter_csv_chunks(fileobj, header, chunk_rows=10)
+
+    assert missing_columns(header) == []
+    assert chunk["amt"].tolist() == df[" AMT "].tolist()
+    assert "Unnamed: 0" not in chunk
+
+
+def test_missing_columns():
+    df = generate_transactions(5, seed=1).drop(columns=["amt", "merchant"])
+
+    assert missing_columns(read_header(csv_bytes(df))) == ["merchant", "amt"]
+
+
+def test_duplicates_within_a_chunk_are_dropped():
+    df = generate_transactions(5, seed=1)
+    df = pd.concat([df, df.iloc[[1, 3]]], ignore_index=True)
+    fileobj = csv_bytes(df)
+
+    (chunk,) = iter_csv_chunks(fileobj, read_header(fileobj), chunk_rows=10)
+
+    assert chunk["trans_num"].tolist() == df["trans_num"].iloc[:5].tolist()
+
+
+def test_bad_values_raise_ingest_error():
+    df = generate_transactions(5, seed=1)
+    df.loc[3, "amt"] = "twelve"
+    fileobj = csv_bytes(df)
+
+    with pytest.raises(IngestError):
+        list(iter_csv_chunks(fileobj, read_header(fileobj), chunk_rows=2))
+
+
+def test_upload_stores_every_chunk(run_db, client, upload_csv, monkeypatch):
+    monkeypatch.setattr(current_config, "UPLOAD_CHUNK_ROWS", 16)
+    df = generate_transactions(100, seed=1)
+
+    async def scenario():
+        async with client() as api:
+            load = await upload_csv(api, df)
+        stored = (
+            await Transaction.all().order_by("id").values_list("trans_num", flat=True)
+        )
+        return load, stored
+
+    load, stored = run_db(scenario)
+
+    assert (load["rows"], load["duplicates"]) == (100, 0)
+    assert stored == df["trans_num"].tolist()
+
+
+def test_upload_rejects_bad_values(run_db, client, monkeypatch):
+    monkeypatch.setattr(current_config, "UPLOAD_CHUNK_ROWS", 16)
+    df = generate_transactions(100, seed=1)
+    df.loc[70, "amt"] = "twelve"
+
+    async def scenario():
+        async with client() as api:
+            response = await api.post(
+                "/upload-csv",
+                files={"file": ("bad.csv", df.to_csv(index=False).encode())},
+            )
+        return response, await Transaction.all().count()
+
+    response, stored = run_db(scenario)
+
+    assert response.status_code == 400
+    assert "Data conversion error" in response.json()["detail"]
+    # Chunks before the bad one are rolled back with it
+    assert stored == 0
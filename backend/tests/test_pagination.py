@@ -0,0 +1,95 @@
+import base64
+import json
+from datetime import datetime, timezone
+
+import pytest
+from benchmarks.synthetic import generate_transactions
+from config import current_config
+from models.transaction import Transaction
+from utils.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2025, 3, 25, 12, 30, 1, 250, tzinfo=timezone.utc)
+
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not a cursor",
+        base64.urlsafe_b64encode(b'["yesterday",1]').decode(),
+        base64.urlsafe_b64encode(b'{"id":1}').decode(),
+        encode_cursor(datetime(2025, 1, 1), 1)[:-3],
+    ],
+)
+def test_tampered_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+async def walk(api, limit: int, **filters) -> list:
+    # Follows next_cursor from the first page to the last
+    ids, params = [], {"limit": limit, **filters}
+    while True:
+        response = await api.get("/transactions", params=params)
+        assert response.status_code == 200, response.text
+        page = response.json()
+        ids += [row["id"] for row in page["transactions"]]
+        if page["next_cursor"] is None:
+            return ids, page["total"]
+        params["cursor"] = page["next_cursor"]
+
+
+def test_cursor_pages_return_every_row_once(run_db, client, upload_csv, monkeypatch):
+    # Several chunks and uploads: rows of one chunk share created_at
+    monkeypatch.setattr(current_config, "UPLOAD_CHUNK_ROWS", 16)
+    df = generate_transactions(90, fraud_rate=0.3, seed=1)
+
+    async def scenario():
+        results = {}
+        async with client() as api:
+            await upload_csv(api, df.iloc[:50])
+            await upload_csv(api, df.iloc[50:])
+            for name, filters in {
+                "all": {},
+                "fraud": {"is_fraud": "true"},
+                "legit": {"is_fraud": "false"},
+            }.items():
+                results[name] = await walk(api, limit=7, **filters)
+        rows = await Transaction.all().order_by("id").values("id", "is_fraud")
+        return results, rows
+
+    results, rows = run_db(scenario)
+
+    expected = {
+        "all": [row["id"] for row in rows],
+        "fraud": [row["id"] for row in rows if row["is_fraud"]],
+        "legit": [row["id"] for row in rows if not row["is_fraud"]],
+    }
+    for name, (ids, total) in results.items():
+        assert ids == expected[name], name
+        assert total == len(expected[name])
+    assert 0 < len(expected["fraud"]) < len(rows)
+
+
+def test_tampered_cursor_is_a_bad_request(run_db, client, upload_csv):
+    async def scenario():
+        async with client() as api:
+            await upload_csv(api, generate_transactions(10, seed=1))
+            first = (await api.get("/transactions", params={"limit": 3})).json()
+            raw = base64.urlsafe_b64decode(first["next_cursor"] + "==")
+            created_at, _ = json.loads(raw)
+            forged = base64.urlsafe_b64encode(
+                json.dumps([created_at, "three"]).encode()
+            ).decode()
+            return [
+                await api.get("/transactions", params={"cursor": cursor})
+                for cursor in ("garbage!", first["next_cursor"][:-2], forged)
+            ]
+
+    responses = run_db(scenario)
+
+    assert [response.status_code for response in responses] == [400, 400, 400]
+    assert all("Invalid cursor" in r.json()["detail"] for r in responses)
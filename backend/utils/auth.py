@@ -5,10 +5,15 @@ from fastapi import HTTPException, Request, status
 from jose import JWTError, jwt
 from models.user import User
 from passlib.context import CryptContext
+from tortoise.signals import post_delete, post_save
+from utils.user_cache import UserCache
 
 # Password hashing context
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Users of recent requests, so polling clients do not hit the database each time
+user_cache = UserCache(current_config.USER_CACHE_TTL, current_config.USER_CACHE_SIZE)
+
 
 # -----------------------------
 # Password Utilities
@@ -35,6 +40,24 @@ def create_access_token(
     )
 
 
+def decode_access_token(token: str) -> dict:
+    try:
+        payload = jwt.decode(
+            token, current_config.SECRET_KEY, algorithms=[current_config.ALGORITHM]
+        )
+    except JWTError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token decode error",
+        )
+    if payload.get("sub") is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token",
+        )
+    return payload
+
+
 # -----------------------------
 # User Retrieval from Cookie Token
 # -----------------------------
@@ -46,21 +69,12 @@ async def get_current_user(request: Request):
             detail="Authentication credentials missing",
         )
 
-    try:
-        payload = jwt.decode(
-            token, current_config.SECRET_KEY, algorithms=[current_config.ALGORITHM]
-        )
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token",
-            )
-    except JWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token decode error",
-        )
+    payload = decode_access_token(token)
+    user_id: str = payload["sub"]
+
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
 
     user = await User.get_or_none(id=user_id)
     if user is None:
@@ -69,4 +83,19 @@ async def get_current_user(request: Request):
             detail="User not found",
         )
 
+    user_cache.put(user_id, user, payload.get("exp"))
     return user
+
+
+# -----------------------------
+# Cache Invalidation
+# -----------------------------
+# Only reaches this process; other workers drop the user within USER_CACHE_TTL
+@post_save(User)
+async def _user_saved(sender, instance: User, created, using_db, update_fields):
+    user_cache.invalidate(str(instance.id))
+
+
+@post_delete(User)
+async def _user_deleted(sender, instance: User, using_db):
+    user_cache.invalidate(str(instance.id))
@@ -0,0 +1,106 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+from config import current_config
+from fastapi import HTTPException, status
+from utils.auth import get_password_hash, verify_password
+
+T = TypeVar("T")
+
+
+@dataclass
+class HashTiming:
+    # Seconds waiting for a free slot, then seconds spent in bcrypt
+    queue: float
+    hash: float
+
+    def server_timing(self) -> str:
+        # Server-Timing header value, in milliseconds
+        return f"queue;dur={self.queue * 1000:.1f}, hash;dur={self.hash * 1000:.1f}"
+
+
+@dataclass
+class HashStats:
+    count: int = 0
+    rejected: int = 0
+    queue_seconds: float = 0.0
+    hash_seconds: float = 0.0
+    max_queue_seconds: float = 0.0
+    max_hash_seconds: float = 0.0
+
+    def record(self, timing: HashTiming):
+        self.count += 1
+        self.queue_seconds += timing.queue
+        self.hash_seconds += timing.hash
+        self.max_queue_seconds = max(self.max_queue_seconds, timing.queue)
+        self.max_hash_seconds = max(self.max_hash_seconds, timing.hash)
+
+
+# -----------------------------------------------
+# Bounded bcrypt executor
+# -----------------------------------------------
+class PasswordHasher:
+    """
+    Runs bcrypt off the event loop. At most `workers` hashes run at once, in
+    threads (bcrypt releases the GIL); a caller that cannot get a slot within
+    `queue_timeout` seconds gets a 503 instead of waiting behind a login burst.
+    """
+
+    def __init__(self, workers: int, queue_timeout: float):
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.stats: Dict[str, HashStats] = {"hash": HashStats(), "verify": HashStats()}
+
+    async def _run(
+        self, operation: str, fn: Callable[..., T], *args
+    ) -> Tuple[T, HashTiming]:
+        if self._slots is None:
+            # Created lazily so they belong to the server's event loop
+            self._slots = asyncio.Semaphore(self.workers)
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="password-hash"
+            )
+
+        queued = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.stats[operation].rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many sign-in requests, please retry shortly.",
+                headers={"Retry-After": "1"},
+            )
+        try:
+            started = time.perf_counter()
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._executor, fn, *args)
+            timing = HashTiming(started - queued, time.perf_counter() - started)
+        finally:
+            self._slots.release()
+
+        self.stats[operation].record(timing)
+        return result, timing
+
+    async def hash(self, password: str) -> Tuple[str, HashTiming]:
+        return await self._run("hash", get_password_hash, password)
+
+    async def verify(
+        self, password: str, hashed_password: str
+    ) -> Tuple[bool, HashTiming]:
+        return await self._run("verify", verify_password, password, hashed_password)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self._executor, self._slots = None, None
+
+
+password_hasher = PasswordHasher(
+    current_config.PASSWORD_HASH_WORKERS, current_config.PASSWORD_HASH_QUEUE_TIMEOUT
+)
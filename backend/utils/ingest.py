@@ -0,0 +1,127 @@
+from typing import BinaryIO, Dict, Iterator, List
+
+import pandas as pd
+from config import current_config
+from ml.features import DERIVED_FEATURES, feature_transformer, parse_dates
+
+# -----------------------------
+# Upload Schema
+# -----------------------------
+REQUIRED_COLUMNS = (
+    "trans_date_trans_time",
+    "cc_num",
+    "merchant",
+    "category",
+    "amt",
+    "first",
+    "last",
+    "gender",
+    "street",
+    "city",
+    "state",
+    "zip",
+    "lat",
+    "long",
+    "city_pop",
+    "job",
+    "dob",
+    "trans_num",
+    "unix_time",
+    "merch_lat",
+    "merch_long",
+    "is_fraud",
+)
+
+# Identifiers are parsed as text so card numbers keep their digits
+STRING_COLUMNS = (
+    "trans_date_trans_time",
+    "cc_num",
+    "merchant",
+    "category",
+    "first",
+    "last",
+    "gender",
+    "street",
+    "city",
+    "state",
+    "zip",
+    "job",
+    "dob",
+    "trans_num",
+)
+FLOAT_COLUMNS = ("amt", "lat", "long", "merch_lat", "merch_long")
+INT_COLUMNS = ("city_pop", "unix_time")
+
+# Columns of a coerced chunk: the upload schema plus the stored model features
+CHUNK_COLUMNS = list(REQUIRED_COLUMNS) + DERIVED_FEATURES
+
+
+class IngestError(ValueError):
+    pass
+
+
+# -----------------------------
+# Header Handling
+# -----------------------------
+def read_header(fileobj: BinaryIO) -> Dict[str, str]:
+    """Map raw CSV header names to their normalized (stripped, lower-case) form."""
+    fileobj.seek(0)
+    header = pd.read_csv(fileobj, nrows=0, encoding="utf-8").columns
+    fileobj.seek(0)
+    return {raw: raw.strip().lower() for raw in header}
+
+
+def missing_columns(header: Dict[str, str]) -> List[str]:
+    present = set(header.values())
+    return [col for col in REQUIRED_COLUMNS if col not in present]
+
+
+# -----------------------------
+# Chunked Reading
+# -----------------------------
+def iter_csv_chunks(
+    fileobj: BinaryIO, header: Dict[str, str], chunk_rows: int
+) -> Iterator[pd.DataFrame]:
+    """
+    Yield typed DataFrames of at most `chunk_rows` rows, read straight from the
+    (spooled) upload file. Columns outside the upload schema are never parsed.
+    """
+    wanted = {raw: norm for raw, norm in header.items() if norm in REQUIRED_COLUMNS}
+    dtypes = {raw: str for raw, norm in wanted.items() if norm in STRING_COLUMNS}
+
+    fileobj.seek(0)
+    reader = pd.read_csv(
+        fileobj,
+        usecols=list(wanted),
+        dtype=dtypes,
+        chunksize=chunk_rows,
+        encoding="utf-8",
+    )
+    for chunk in reader:
+        chunk.rename(columns=wanted, inplace=True)
+        yield coerce_chunk(chunk)
+
+
+def coerce_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Vectorized dtype coercion of one chunk into the Transaction column types,
+    plus the derived features stored with each row.
+    """
+    try:
+        for col in FLOAT_COLUMNS:
+            df[col] = pd.to_numeric(df[col], errors="raise").astype("float64")
+        for col in INT_COLUMNS:
+            df[col] = pd.to_numeric(df[col], errors="raise").astype("int64")
+        df["is_fraud"] = pd.to_numeric(df["is_fraud"], errors="raise").astype(bool)
+        # Parsed once here and stored typed; features are derived from it below
+        df["trans_date_trans_time"] = feature_transformer.parse_timestamps(
+            df["trans_date_trans_time"]
+        )
+        df["dob"] = parse_dates(df["dob"], current_config.DATE_OF_BIRTH_FORMAT).dt.date
+    except (TypeError, ValueError) as e:
+        raise IngestError(str(e)) from e
+
+    # Keep only the first occurrence of a transaction within the chunk
+    df.drop_duplicates(subset="trans_num", keep="first", inplace=True)
+    feature_transformer.add_derived(df)
+    return df[CHUNK_COLUMNS]
@@ -0,0 +1,103 @@
+import time
+
+from prometheus_client import Counter, Gauge, Histogram
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Prometheus metrics, served by GET /metrics (routes/metrics.py). With several
+# worker processes (SERVER_WORKERS), set PROMETHEUS_MULTIPROC_DIR: each worker
+# then writes its values there and any worker's /metrics reports all of them,
+# counters and histograms summed; gauges declare how they are combined.
+
+# -----------------------------------------------
+# HTTP
+# -----------------------------------------------
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to the end of its response, per route.",
+    ["method", "route"],
+)
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "Responses per route and status.",
+    ["method", "route", "status"],
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Requests being handled right now.",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+
+# -----------------------------------------------
+# Ingest, scoring and training
+# -----------------------------------------------
+INGEST_ROWS = Counter("ingest_rows_total", "Transactions stored by /upload-csv.")
+INGEST_DUPLICATES = Counter(
+    "ingest_duplicate_rows_total", "Uploaded transactions skipped as already stored."
+)
+INGEST_ROWS_PER_SECOND = Gauge(
+    "ingest_rows_per_second",
+    "Bulk load throughput of the last /upload-csv.",
+    multiprocess_mode="mostrecent",
+)
+
+# model_load: reading the artifact; features / inference: per score_frame call;
+# serialization: turning scored rows into response records
+ML_STAGE_SECONDS = Histogram(
+    "ml_stage_duration_seconds", "Time spent per model serving stage.", ["stage"]
+)
+
+TRAINING_SECONDS = Histogram(
+    "training_duration_seconds",
+    "Wall time of successful training jobs.",
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600),
+)
+TRAINING_ROWS = Gauge(
+    "training_dataset_rows",
+    "Rows read by the last successful training job.",
+    multiprocess_mode="mostrecent",
+)
+TRAINING_JOBS = Counter("training_jobs_total", "Finished training jobs.", ["status"])
+
+
+# -----------------------------------------------
+# Middleware
+# -----------------------------------------------
+class MetricsMiddleware:
+    """
+    Records latency, status and in-flight count of every HTTP request. Routes are
+    labelled with their path template (e.g. /train-model/jobs/{job_id}), so
+    path parameters do not create new series.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+
+        async def send_with_status(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight = HTTP_IN_FLIGHT.labels(method)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_flight.dec()
+            # Set by the router once a route matched
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            HTTP_REQUEST_SECONDS.labels(method, path).observe(
+                time.perf_counter() - started
+            )
+            HTTP_REQUESTS.labels(method, path, str(status_code)).inc()
@@ -0,0 +1,67 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from models.user import User
+
+
+class UserCache:
+    """
+    Authenticated users by token subject. An entry lives at most `ttl` seconds
+    and never past the expiry of the token that loaded it; beyond `max_size`
+    entries the least recently used one is evicted. Cached users are shared
+    between requests and must be treated as read-only.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        max_size: int,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._clock = clock
+        # subject -> (user, deadline on `clock`), least recently used first
+        self._entries: "OrderedDict[str, Tuple[User, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, subject: str) -> Optional[User]:
+        entry = self._entries.get(subject)
+        if entry is None or entry[1] <= self._clock():
+            if entry is not None:
+                del self._entries[subject]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(subject)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, subject: str, user: User, token_expiry: Optional[float] = None):
+        """Cache `user`; `token_expiry` is the token's "exp" claim (Unix time)."""
+        lifetime = self.ttl
+        if token_expiry is not None:
+            lifetime = min(lifetime, token_expiry - time.time())
+        if lifetime <= 0 or self.max_size <= 0:
+            return
+        self._entries[subject] = (user, self._clock() + lifetime)
+        self._entries.move_to_end(subject)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, subject: str):
+        self._entries.pop(subject, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
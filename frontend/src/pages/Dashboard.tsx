@@ -22,6 +22,7 @@ import { LinearProgress } from "@mui/material";
 import axios from "axios";
 import logo from "../assets/logo.png";
 import FraudCharts from "./FraudCharts";
+import { DashboardStats } from "../types/stats";
 
 const Dashboard: React.FC = () => {
   const [user, setUser] = useState<{ firstname: string } | null>(null);
@@ -35,17 +36,17 @@ const Dashboard: React.FC = () => {
   const fileInputRef = useRef<HTMLInputElement>(null);
 
   const [rows, setRows] = useState<any[]>([]);
-  const [totalRows, setTotalRows] = useState(0);
+  const [hasNextPage, setHasNextPage] = useState(false);
   const [page, setPage] = useState(0);
   const [pageSize, setPageSize] = useState(10);
   const [loading, setLoading] = useState(false);
-  const [showFraudOnly, setShowFraudOnly] = useState(false);
   const [selectedTx, setSelectedTx] = useState<any | null>(null);
+  // next_cursor of each loaded page, keyed by the page it leads to
+  const cursorsRef = useRef<Record<number, number>>({ 0: 0 });
 
-  const [predictedFraud, setPredictedFraud] = useState<any[]>([]);
-  const [allPredicted, setAllPredicted] = useState<any[]>([]);
   const [showPredictions, setShowPredictions] = useState(false);
   const [showOnlyPredFraud, setShowOnlyPredFraud] = useState(true);
+  const [stats, setStats] = useState<DashboardStats | null>(null);
 
   const columns: GridColDef[] = [
     { field: "id", headerName: "ID", width: 70 },
@@ -62,21 +63,30 @@ const Dashboard: React.FC = () => {
       .catch(() => window.location.href = "/login");
   }, []);
 
-  const fetchTransactions = async () => {
+  const fetchPredictions = async () => {
     setLoading(true);
     try {
-      const res = await axios.get(`http://localhost:8000/transactions?limit=${pageSize}&offset=${page * pageSize}${showFraudOnly ? "&is_fraud=true" : ""}`);
-      setRows(res.data.transactions);
-      setTotalRows(res.data.total);
+      // Pages are only reached one after another, so the cursor is known
+      const cursor = cursorsRef.current[page] ?? 0;
+      const res = await axios.get(`http://localhost:8000/predict-fraud/page?limit=${pageSize}&cursor=${cursor}${showOnlyPredFraud ? "&fraud_only=true" : ""}`, { withCredentials: true });
+      setRows(res.data.items);
+      if (res.data.next_cursor !== null) cursorsRef.current[page + 1] = res.data.next_cursor;
+      setHasNextPage(res.data.next_cursor !== null);
     } catch (err) {
-      console.error("Error fetching transactions:", err);
+      console.error("Error fetching predictions:", err);
     }
     setLoading(false);
   };
 
+  // Cursors depend on the filter, page size and data; start over from page 0
+  const resetPages = () => {
+    cursorsRef.current = { 0: 0 };
+    setPage(0);
+  };
+
   useEffect(() => {
-    fetchTransactions();
-  }, [page, pageSize, showFraudOnly, successOpen]);
+    if (showPredictions) fetchPredictions();
+  }, [page, pageSize, showOnlyPredFraud, showPredictions, successOpen]);
 
   useEffect(() => {
     if (uploadProgress === 100) {
@@ -106,10 +116,11 @@ const Dashboard: React.FC = () => {
         withCredentials: true,
       });
 
-      const res = await axios.get("http://localhost:8000/predict-fraud", { withCredentials: true });
+      // The grid loads its pages itself once the predictions are shown
+      const statsRes = await axios.get("http://localhost:8000/stats", { withCredentials: true });
 
-      setPredictedFraud(res.data.fraudulent);
-      setAllPredicted(res.data.all);
+      setStats(statsRes.data);
+      resetPages();
       setShowPredictions(true);
       setSuccessOpen(true);
       setFile(null);
@@ -214,19 +225,30 @@ const Dashboard: React.FC = () => {
           </Typography>
           <Button
             variant="outlined"
-            onClick={() => setShowOnlyPredFraud(!showOnlyPredFraud)}
+            onClick={() => {
+              setShowOnlyPredFraud(!showOnlyPredFraud);
+              resetPages();
+            }}
             sx={{ mb: 2 }}
           >
             {showOnlyPredFraud ? "Show All Predictions" : "Show Only Predicted Frauds"}
           </Button>
           <Box height={400}>
             <DataGrid
-              rows={(showOnlyPredFraud ? predictedFraud : allPredicted).map((row, index) => ({ id: index + 1, ...row }))}
+              rows={rows}
               columns={columns}
-              initialState={{
-                pagination: {
-                  paginationModel: { pageSize: 10, page: 0 },
-                },
+              loading={loading}
+              paginationMode="server"
+              rowCount={-1}
+              paginationMeta={{ hasNextPage }}
+              paginationModel={{ page, pageSize }}
+              onPaginationModelChange={(model) => {
+                if (model.pageSize !== pageSize) {
+                  setPageSize(model.pageSize);
+                  resetPages();
+                } else {
+                  setPage(model.page);
+                }
               }}
               pageSizeOptions={[10, 20]}
             />
@@ -234,7 +256,7 @@ const Dashboard: React.FC = () => {
         </>
       )}
 
-      {showPredictions && tab === 1 && <FraudCharts data={predictedFraud} />}
+      {showPredictions && tab === 1 && stats && <FraudCharts stats={stats} />}
 
       <Dialog open={!!selectedTx} onClose={() => setSelectedTx(null)} fullWidth maxWidth="sm">
         <DialogTitle>Transaction #{selectedTx?.id}</DialogTitle>
@@ -19,50 +19,29 @@ import {
   AreaChart,
   Area,
 } from "recharts";
-
-interface Transaction {
-  merchant: string;
-  category: string;
-  amt: number;
-  city: string;
-  is_fraud: boolean;
-  predicted_fraud: number;
-  hour: number;
-  day_of_week: number;
-  month: number;
-}
+import { DashboardStats } from "../types/stats";
 
 interface FraudChartsProps {
-  data: Transaction[];
+  stats: DashboardStats;
 }
 
 const COLORS = ["#0088FE", "#00C49F", "#FFBB28", "#FF8042", "#A28FD0", "#FF6384"];
+const DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"];
 
-const FraudCharts: React.FC<FraudChartsProps> = ({ data }) => {
-  // Aggregate data
-  const categoryCount = data.reduce((acc: Record<string, number>, curr) => {
-    acc[curr.category] = (acc[curr.category] || 0) + 1;
-    return acc;
-  }, {});
-  const categoryData = Object.entries(categoryCount).map(([key, value]) => ({
-    category: key,
-    count: value,
-  }));
+const FraudCharts: React.FC<FraudChartsProps> = ({ stats }) => {
+  // Counts are aggregated by the backend (/stats); only predicted frauds are charted
+  const categoryData = stats.category
+    .filter((b) => b.predicted_fraud > 0)
+    .map((b) => ({ category: b.key, count: b.predicted_fraud }));
 
-  const hourlyData = Array.from({ length: 24 }, (_, i) => ({
-    hour: i,
-    count: data.filter((d) => d.hour === i).length,
-  }));
+  const hourlyData = stats.hour.map((b) => ({ hour: b.key, count: b.predicted_fraud }));
 
-  const dailyData = Array.from({ length: 7 }, (_, i) => ({
-    day: ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"][i],
-    count: data.filter((d) => d.day_of_week === i).length,
+  const dailyData = stats.day_of_week.map((b) => ({
+    day: DAYS[b.key],
+    count: b.predicted_fraud,
   }));
 
-  const monthlyData = Array.from({ length: 12 }, (_, i) => ({
-    month: i + 1,
-    count: data.filter((d) => d.month === i + 1).length,
-  }));
+  const monthlyData = stats.month.map((b) => ({ month: b.key, count: b.predicted_fraud }));
 
   return (
     <Box mt={6}>
@@ -0,0 +1,25 @@
+export interface StatsBucket<K = string | number> {
+  key: K;
+  total: number;
+  fraud: number;
+  predicted_fraud: number;
+  scored: number;
+  fraud_rate: number;
+  predicted_fraud_rate: number;
+}
+
+export interface DashboardStats {
+  data_version: number;
+  cached: boolean;
+  totals: {
+    total: number;
+    fraud: number;
+    predicted_fraud: number;
+    scored: number;
+  };
+  category: StatsBucket<string>[];
+  merchant: StatsBucket<string>[];
+  hour: StatsBucket<number>[];
+  day_of_week: StatsBucket<number>[];
+  month: StatsBucket<number>[];
+}